@@ -0,0 +1,151 @@
+"""
+Occupancy analytics for RFID Attendance System
+Turns check-in/check-out intervals into an occupancy-over-time curve, peak
+occupancy and an hour-of-week heatmap with a sort-and-sweep over interval
+endpoints. Completed days are computed once and cached in day_cache.
+"""
+from datetime import datetime, timedelta
+
+import day_cache
+import models
+
+CACHE_KIND = 'occupancy'
+
+def _parse(timestamp):
+    """Parse a stored timestamp ('YYYY-MM-DD HH:MM:SS[.ffffff]')"""
+    return datetime.fromisoformat(timestamp)
+
+def _sweep_day(day_start, intervals):
+    """Sweep one day's clipped (start, end) intervals
+
+    Returns the day's payload: occupancy change points, peak, and per-hour
+    person-minutes and maximum occupancy.
+    """
+    events = []
+    for start, end in intervals:
+        if end > start:
+            events.append((start, 1))
+            events.append((end, -1))
+    # Departures sort before arrivals at the same instant, so a hand-off is not a peak
+    events.sort(key=lambda event: (event[0], event[1]))
+
+    curve = []
+    person_minutes = [0.0] * 24
+    occupancy = 0
+    peak, peak_time = 0, None
+    previous = day_start
+    day_end = day_start + timedelta(days=1)
+
+    for time, delta in events:
+        # Spread the current occupancy over the hours between the previous event and this one
+        segment_start = previous
+        while occupancy and segment_start < time:
+            hour_end = segment_start.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+            segment_end = min(hour_end, time)
+            person_minutes[segment_start.hour] += occupancy * (segment_end - segment_start).total_seconds() / 60
+            segment_start = segment_end
+
+        occupancy += delta
+        if time >= day_end:
+            # Sessions clipped at midnight all end here; tomorrow's curve starts from zero
+            pass
+        elif curve and curve[-1][0] == time:
+            curve[-1][1] = occupancy
+        else:
+            curve.append([time, occupancy])
+        if occupancy > peak:
+            peak, peak_time = occupancy, time
+        previous = time
+
+    # Peak within each hour: the level carried in at the hour's start plus every change inside it
+    hourly_max = [0] * 24
+    level = 0
+    index = 0
+    for hour in range(24):
+        hour_start = day_start + timedelta(hours=hour)
+        hour_end = hour_start + timedelta(hours=1)
+        changes_at_start = index < len(curve) and curve[index][0] == hour_start
+        hourly_max[hour] = 0 if changes_at_start else level
+        while index < len(curve) and curve[index][0] < hour_end:
+            level = curve[index][1]
+            hourly_max[hour] = max(hourly_max[hour], level)
+            index += 1
+
+    return {
+        'date': day_start.strftime('%Y-%m-%d'),
+        'curve': [[time.strftime('%H:%M:%S'), value] for time, value in curve],
+        'peak': peak,
+        'peak_time': peak_time.strftime('%H:%M:%S') if peak_time else None,
+        'person_minutes_by_hour': [round(minutes, 2) for minutes in person_minutes],
+        'max_by_hour': hourly_max
+    }
+
+def compute_days(first_day, last_day, now):
+    """Compute payloads for every day in [first_day, last_day] from one interval query"""
+    range_start = datetime.combine(first_day, datetime.min.time())
+    range_end = datetime.combine(last_day + timedelta(days=1), datetime.min.time())
+    sessions = models.get_sessions_between(range_start, range_end)
+
+    # Bucket each session's clipped interval into the days it covers
+    per_day = {}
+    for session in sessions:
+        start = max(_parse(session['check_in_time']), range_start)
+        end = _parse(session['check_out_time']) if session['check_out_time'] else now
+        end = min(end, range_end)
+        day = start.date()
+        while start < end:
+            next_midnight = datetime.combine(day + timedelta(days=1), datetime.min.time())
+            per_day.setdefault(day, []).append((start, min(end, next_midnight)))
+            start, day = next_midnight, day + timedelta(days=1)
+
+    payloads = {}
+    day = first_day
+    while day <= last_day:
+        payloads[day.strftime('%Y-%m-%d')] = _sweep_day(
+            datetime.combine(day, datetime.min.time()), per_day.get(day, []))
+        day += timedelta(days=1)
+    return payloads
+
+def get_day_payloads(first_day, last_day, now=None):
+    """Per-day payloads for a date range, from day_cache where the day is complete"""
+    now = now or datetime.now()
+    return day_cache.cached_per_day(CACHE_KIND, day_cache.days_between(first_day, last_day),
+                                    lambda first, last: compute_days(first, last, now), now.date())
+
+def occupancy_report(first_day, last_day, now=None):
+    """Occupancy curve, peak and hour-of-week heatmap for a date range"""
+    days = get_day_payloads(first_day, last_day, now)
+
+    # Hour-of-week heatmap: [weekday 0=Monday][hour] average and peak occupancy
+    person_minutes = [[0.0] * 24 for _ in range(7)]
+    hours_seen = [[0] * 24 for _ in range(7)]
+    peak_heatmap = [[0] * 24 for _ in range(7)]
+    peak = {'occupancy': 0, 'date': None, 'time': None}
+
+    for payload in days:
+        weekday = datetime.strptime(payload['date'], '%Y-%m-%d').weekday()
+        for hour in range(24):
+            person_minutes[weekday][hour] += payload['person_minutes_by_hour'][hour]
+            hours_seen[weekday][hour] += 1
+            peak_heatmap[weekday][hour] = max(peak_heatmap[weekday][hour], payload['max_by_hour'][hour])
+        if payload['peak'] > peak['occupancy']:
+            peak = {'occupancy': payload['peak'], 'date': payload['date'], 'time': payload['peak_time']}
+
+    average_heatmap = [
+        [round(person_minutes[weekday][hour] / (60 * hours_seen[weekday][hour]), 2)
+         if hours_seen[weekday][hour] else 0
+         for hour in range(24)]
+        for weekday in range(7)
+    ]
+
+    return {
+        'start': first_day.strftime('%Y-%m-%d'),
+        'end': last_day.strftime('%Y-%m-%d'),
+        'peak': peak,
+        'curve': [[f"{payload['date']} {time}", value]
+                  for payload in days for time, value in payload['curve']],
+        'daily_peaks': [{'date': payload['date'], 'peak': payload['peak'], 'time': payload['peak_time']}
+                        for payload in days],
+        'heatmap_average': average_heatmap,
+        'heatmap_peak': peak_heatmap
+    }
@@ -2,22 +2,52 @@
 Flask Web Application for RFID Attendance System
 Main server with all routes and WebSocket support
 """
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, g, send_from_directory
 from flask_socketio import SocketIO, emit
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import generate_password_hash
 from functools import wraps
 from datetime import datetime, timedelta
 import models
 import config
-import threading
+import workers
+import backup
+import analytics
+import report_engine
+import profiler
+import auth
+from cache import SharedCache
+import os
+import socket
+import hmac
 import time
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = config.SECRET_KEY
-socketio = SocketIO(app, cors_allowed_origins="*")
 
-# Initialize database on startup
-models.init_db()
+def _create_socketio():
+    """Create the Socket.IO server, sharing broadcasts across workers if a queue is configured"""
+    queue = config.SOCKETIO_MESSAGE_QUEUE
+    if queue and queue.startswith('unix://'):
+        from message_bus import UnixSocketManager
+        return SocketIO(app, cors_allowed_origins="*", async_mode=config.ASYNC_MODE,
+                        client_manager=UnixSocketManager(queue))
+    return SocketIO(app, cors_allowed_origins="*", async_mode=config.ASYNC_MODE,
+                    message_queue=queue)
+
+socketio = _create_socketio()
+
+# Identifies this process for leader election between web workers
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# Settings rarely change; other workers see updates within CACHE_CHECK_INTERVAL
+settings_cache = SharedCache('settings')
+
+# The whole (tiny) admins table, so unknown usernames in a login flood never reach the DB
+admins_cache = SharedCache('admins')
+
+def get_setting(key):
+    """Cached setting value; cache misses query SQLite on the DB pool, off the event loop"""
+    return workers.run_blocking(settings_cache.get, key, models.get_setting)
 
 # ============================================================================
 # Authentication Helpers
@@ -32,6 +62,32 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def replication_token_required(f):
+    """Decorator to require the shared replication token (node-to-central calls)"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        # Replication endpoints only exist on the central server
+        if config.REPLICATION_ROLE != 'central':
+            return jsonify({'success': False, 'message': 'Not found'}), 404
+        token = request.headers.get('X-Replication-Token', '')
+        if not hmac.compare_digest(token, config.REPLICATION_TOKEN):
+            return jsonify({'success': False, 'message': 'Invalid replication token'}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
+# ============================================================================
+# Profiling Hooks
+# ============================================================================
+
+@app.before_request
+def start_request_profile():
+    """Profile this request if a cprofile capture is running (no-op otherwise)"""
+    g.profile_token = profiler.begin()
+
+@app.teardown_request
+def end_request_profile(exc):
+    profiler.end(g.pop('profile_token', None))
+
 # ============================================================================
 # Authentication Routes
 # ============================================================================
@@ -40,13 +96,31 @@ def login_required(f):
 def login():
     """Admin login page"""
     if request.method == 'POST':
-        data = request.get_json()
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'success': False, 'message': 'Expected a JSON object'}), 400
         username = data.get('username')
         password = data.get('password')
+        if not isinstance(username, str) or not isinstance(password, str):
+            return jsonify({'success': False, 'message': 'username and password must be strings'}), 400
         
-        admin = models.get_admin_by_username(username)
+        wait = auth.check_rate_limit(request.remote_addr, username)
+        if wait:
+            response = jsonify({'success': False, 'message': 'Too many login attempts, try again later'})
+            response.headers['Retry-After'] = str(int(wait) + 1)
+            return response, 429
         
-        if admin and check_password_hash(admin['password_hash'], password):
+        admins = workers.run_blocking(admins_cache.get, 'all', lambda _: models.get_admins_by_username())
+        admin = admins.get(username)
+        
+        try:
+            valid = bool(admin and password) and auth.verify_password(admin['password_hash'], password)
+        except auth.HashPoolBusy:
+            response = jsonify({'success': False, 'message': 'Server busy, try again shortly'})
+            response.headers['Retry-After'] = '1'
+            return response, 503
+        
+        if valid:
             session['admin_id'] = admin['id']
             session['admin_name'] = admin['full_name']
             return jsonify({'success': True})
@@ -65,10 +139,7 @@ def logout():
 def setup_admin():
     """Initial admin setup - only works if no admins exist"""
     # Check if any admins exist
-    with models.get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute('SELECT COUNT(*) as count FROM admins')
-        count = cursor.fetchone()['count']
+    count = len(workers.run_blocking(models.get_admins_by_username))
     
     if count > 0:
         return "Admin accounts already exist. Use /login to access the system.", 403
@@ -80,8 +151,9 @@ def setup_admin():
         admin1_hash = generate_password_hash(data.get('password1'))
         admin2_hash = generate_password_hash(data.get('password2'))
         
-        models.create_admin(data.get('username1'), admin1_hash, data.get('fullname1'))
-        models.create_admin(data.get('username2'), admin2_hash, data.get('fullname2'))
+        workers.run_blocking(models.create_admin, data.get('username1'), admin1_hash, data.get('fullname1'))
+        workers.run_blocking(models.create_admin, data.get('username2'), admin2_hash, data.get('fullname2'))
+        admins_cache.invalidate()
         
         return jsonify({'success': True})
     
@@ -127,7 +199,7 @@ def reports():
 @login_required
 def get_users():
     """Get all users"""
-    users = models.get_all_users()
+    users = workers.run_blocking(models.get_all_users)
     return jsonify([dict(user) for user in users])
 
 @app.route('/api/users', methods=['POST'])
@@ -137,7 +209,8 @@ def create_user():
     data = request.get_json()
     
     try:
-        user_id = models.create_user(
+        user_id = workers.run_blocking(
+            models.create_user,
             rfid_uid=data['rfid_uid'],
             name=data['name'],
             student_id=data['student_id'],
@@ -156,7 +229,8 @@ def update_user(user_id):
     data = request.get_json()
     
     try:
-        models.update_user(
+        workers.run_blocking(
+            models.update_user,
             user_id=user_id,
             name=data.get('name'),
             student_id=data.get('student_id'),
@@ -177,7 +251,7 @@ def update_user(user_id):
 def delete_user(user_id):
     """Delete user"""
     try:
-        models.delete_user(user_id)
+        workers.run_blocking(models.delete_user, user_id)
         socketio.emit('user_deleted', {'user_id': user_id})
         return jsonify({'success': True})
     except Exception as e:
@@ -190,11 +264,11 @@ def delete_user(user_id):
 @app.route('/api/checkin/current', methods=['GET'])
 def get_current_checkins():
     """Get all currently checked-in users"""
-    checkins = models.get_current_checkins()
+    checkins = workers.run_blocking(models.get_current_checkins)
     
     result = []
     for checkin in checkins:
-        check_in_time = datetime.strptime(checkin['check_in_time'], '%Y-%m-%d %H:%M:%S.%f')
+        check_in_time = datetime.fromisoformat(checkin['check_in_time'])
         duration = datetime.now() - check_in_time
         
         result.append({
@@ -217,9 +291,9 @@ def manual_checkin():
     action = data.get('action')  # 'checkin' or 'checkout'
     
     if action == 'checkin':
-        success, message = models.check_in(user_id)
+        success, message = workers.run_blocking(models.check_in, user_id)
     elif action == 'checkout':
-        success, message = models.check_out(user_id)
+        success, message = workers.run_blocking(models.check_out, user_id)
     else:
         return jsonify({'success': False, 'message': 'Invalid action'}), 400
     
@@ -240,7 +314,7 @@ def scan_card_for_registration():
     try:
         # Import here to avoid issues if hardware not available
         from rfid_scanner import manual_scan
-        result = manual_scan()
+        result = workers.run_blocking(manual_scan)
         
         if result:
             return jsonify({'success': True, 'rfid_uid': result.get('rfid_uid')})
@@ -258,92 +332,107 @@ def scan_card_for_registration():
 def daily_report():
     """Get daily attendance report"""
     date_str = request.args.get('date', datetime.now().strftime('%Y-%m-%d'))
-    start_date = f"{date_str} 00:00:00"
-    end_date = f"{date_str} 23:59:59"
-    
-    checkins = models.get_all_checkins(start_date, end_date)
-    
-    # Calculate statistics
-    total_visits = len(checkins)
-    unique_visitors = len(set(c['user_id'] for c in checkins))
-    
-    # Calculate average duration
-    total_duration = 0
-    completed_visits = 0
-    
-    for checkin in checkins:
-        if checkin['check_out_time']:
-            check_in = datetime.strptime(checkin['check_in_time'], '%Y-%m-%d %H:%M:%S.%f')
-            check_out = datetime.strptime(checkin['check_out_time'], '%Y-%m-%d %H:%M:%S.%f')
-            duration = (check_out - check_in).total_seconds() / 60
-            total_duration += duration
-            completed_visits += 1
-    
-    avg_duration = total_duration / completed_visits if completed_visits > 0 else 0
-    
-    return jsonify({
-        'date': date_str,
-        'total_visits': total_visits,
-        'unique_visitors': unique_visitors,
-        'average_duration_minutes': round(avg_duration, 2),
-        'checkins': [dict(c) for c in checkins]
-    })
+    try:
+        datetime.strptime(date_str, '%Y-%m-%d')
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Date must be YYYY-MM-DD'}), 400
+    return jsonify(workers.run_blocking(report_engine.build_daily_report, date_str))
 
 @app.route('/api/reports/weekly', methods=['GET'])
 @login_required
 def weekly_report():
     """Get weekly attendance statistics"""
     # Get last 7 days
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=7)
+    return jsonify(workers.run_blocking(report_engine.build_weekly_report, datetime.now()))
+
+@app.route('/api/reports/user/<int:user_id>', methods=['GET'])
+@login_required
+def user_history_report(user_id):
+    """Get check-in history for a specific user"""
+    return jsonify(workers.run_blocking(report_engine.build_user_history, user_id))
+
+@app.route('/api/reports/range', methods=['POST'])
+@login_required
+def range_report():
+    """Start a background report over a date range (e.g. a whole season)"""
+    data = request.get_json()
+    try:
+        start = datetime.strptime(data['start'], '%Y-%m-%d').date()
+        end = datetime.strptime(data['end'], '%Y-%m-%d').date()
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'start and end must be YYYY-MM-DD'}), 400
     
-    checkins = models.get_all_checkins(
-        start_date.strftime('%Y-%m-%d 00:00:00'),
-        end_date.strftime('%Y-%m-%d 23:59:59')
-    )
+    if start > end:
+        return jsonify({'success': False, 'message': 'start must not be after end'}), 400
     
-    # Group by day
-    daily_stats = {}
-    for checkin in checkins:
-        date = checkin['check_in_time'][:10]
-        if date not in daily_stats:
-            daily_stats[date] = {'count': 0, 'unique_users': set()}
-        daily_stats[date]['count'] += 1
-        daily_stats[date]['unique_users'].add(checkin['user_id'])
+    try:
+        job = report_engine.submit_range_report(start, end, socketio.start_background_task)
+    except report_engine.JobQueueFull:
+        response = jsonify({'success': False, 'message': 'Too many reports in progress, try again shortly'})
+        response.headers['Retry-After'] = '10'
+        return response, 503
+    return jsonify({'success': True, 'job_id': job['id'], 'status': job['status']}), 202
+
+@app.route('/api/reports/jobs/<job_id>', methods=['GET'])
+@login_required
+def report_job_status(job_id):
+    """Get the status (and result, once done) of a background report"""
+    job = report_engine.get_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Unknown or expired job'}), 404
+    return jsonify(job)
+
+@app.route('/api/reports/hours', methods=['GET'])
+@login_required
+def hours_report():
+    """Get member hour totals and leaderboards from the running ledger"""
+    season = request.args.get('season', models.season_for(datetime.now()))
+    graduating_year = request.args.get('graduating_year', type=int)
+    limit = request.args.get('limit', 10, type=int)
     
-    # Format for response
-    result = []
-    for date, stats in sorted(daily_stats.items()):
-        result.append({
-            'date': date,
-            'total_visits': stats['count'],
-            'unique_visitors': len(stats['unique_users'])
-        })
+    totals = workers.run_blocking(models.get_member_hours, season, graduating_year)
+    leaders = workers.run_blocking(models.get_hours_leaderboard, season, limit, graduating_year)
     
-    return jsonify(result)
+    def entry(row):
+        return {
+            'user_id': row['user_id'],
+            'name': row['name'],
+            'graduating_year': row['graduating_year'],
+            'total_hours': round(row['total_minutes'] / 60, 2),
+            'session_count': row['session_count']
+        }
+    
+    by_year = {}
+    for row in leaders:
+        if row['year_rank'] <= limit:
+            by_year.setdefault(str(row['graduating_year']), []).append(entry(row))
+    
+    return jsonify({
+        'season': season,
+        'totals': [dict(entry(row), student_id=row['student_id'], last_seen=row['last_seen'])
+                   for row in totals],
+        'leaderboard': [entry(row) for row in leaders if row['overall_rank'] <= limit],
+        'leaderboard_by_year': by_year
+    })
 
-@app.route('/api/reports/user/<int:user_id>', methods=['GET'])
+@app.route('/api/analytics/occupancy', methods=['GET'])
 @login_required
-def user_history_report(user_id):
-    """Get check-in history for a specific user"""
-    history = models.get_user_history(user_id, limit=100)
+def occupancy_analytics():
+    """Get occupancy over time, peak occupancy and an hour-of-week heatmap for a date range"""
+    today = datetime.now().date()
+    try:
+        end = datetime.strptime(request.args['end'], '%Y-%m-%d').date() if 'end' in request.args else today
+        start = (datetime.strptime(request.args['start'], '%Y-%m-%d').date()
+                 if 'start' in request.args else end - timedelta(days=6))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Dates must be YYYY-MM-DD'}), 400
     
-    result = []
-    for record in history:
-        duration = None
-        if record['check_out_time']:
-            check_in = datetime.strptime(record['check_in_time'], '%Y-%m-%d %H:%M:%S.%f')
-            check_out = datetime.strptime(record['check_out_time'], '%Y-%m-%d %H:%M:%S.%f')
-            duration = int((check_out - check_in).total_seconds() / 60)
-        
-        result.append({
-            'check_in_time': record['check_in_time'],
-            'check_out_time': record['check_out_time'],
-            'duration_minutes': duration,
-            'auto_checkout': record['auto_checkout']
-        })
+    if start > end:
+        return jsonify({'success': False, 'message': 'start must not be after end'}), 400
     
-    return jsonify(result)
+    report = workers.run_blocking(analytics.occupancy_report, start, end)
+    report['max_occupancy'] = int(get_setting('max_occupancy'))
+    return jsonify(report)
 
 # ============================================================================
 # API Routes - Settings
@@ -354,9 +443,9 @@ def user_history_report(user_id):
 def get_settings():
     """Get system settings"""
     return jsonify({
-        'max_occupancy': models.get_setting('max_occupancy'),
-        'auto_checkout_time': models.get_setting('auto_checkout_time'),
-        'auto_checkout_enabled': models.get_setting('auto_checkout_enabled')
+        'max_occupancy': get_setting('max_occupancy'),
+        'auto_checkout_time': get_setting('auto_checkout_time'),
+        'auto_checkout_enabled': get_setting('auto_checkout_enabled')
     })
 
 @app.route('/api/settings', methods=['POST'])
@@ -366,22 +455,121 @@ def update_settings():
     data = request.get_json()
     
     if 'max_occupancy' in data:
-        models.update_setting('max_occupancy', str(data['max_occupancy']))
+        workers.run_blocking(models.update_setting, 'max_occupancy', str(data['max_occupancy']))
     if 'auto_checkout_time' in data:
-        models.update_setting('auto_checkout_time', data['auto_checkout_time'])
+        workers.run_blocking(models.update_setting, 'auto_checkout_time', data['auto_checkout_time'])
     if 'auto_checkout_enabled' in data:
-        models.update_setting('auto_checkout_enabled', '1' if data['auto_checkout_enabled'] else '0')
+        workers.run_blocking(models.update_setting, 'auto_checkout_enabled',
+                             '1' if data['auto_checkout_enabled'] else '0')
     
+    settings_cache.invalidate()
     return jsonify({'success': True})
 
 @app.route('/api/auto-checkout', methods=['POST'])
 @login_required
 def trigger_auto_checkout():
     """Manually trigger auto-checkout for all users"""
-    count = models.auto_checkout_all()
+    count = workers.run_blocking(models.auto_checkout_all)
     socketio.emit('auto_checkout', {'count': count})
     return jsonify({'success': True, 'count': count})
 
+# ============================================================================
+# API Routes - Multi-site Replication
+# ============================================================================
+
+@app.route('/api/replication/events', methods=['POST'])
+@replication_token_required
+def receive_replicated_events():
+    """Apply a batch of check-in/out events from a scanner node (idempotent)"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'message': 'Expected a JSON object'}), 400
+    node_id = data.get('node_id')
+    events = data.get('events', [])
+    
+    if not node_id or not isinstance(node_id, str):
+        return jsonify({'success': False, 'message': 'node_id is required'}), 400
+    if not isinstance(events, list):
+        return jsonify({'success': False, 'message': 'events must be a list'}), 400
+    
+    # Malformed events come back as 'rejected: ...' results; the rest of the batch still applies
+    results = workers.run_blocking(models.apply_replicated_events, node_id, events)
+    
+    applied = sum(1 for _, result in results if result.startswith('applied'))
+    if applied:
+        socketio.emit('checkin_update', {
+            'action': 'replication',
+            'node_id': node_id,
+            'count': applied,
+            'timestamp': datetime.now().isoformat()
+        })
+    
+    return jsonify({
+        'success': True,
+        'last_seq': max((seq for seq, _ in results if seq is not None), default=None),
+        'results': {str(seq): result for seq, result in results if seq is not None}
+    })
+
+@app.route('/api/replication/users', methods=['GET'])
+@replication_token_required
+def distribute_users():
+    """Get the user table for scanner nodes (unchanged if their generation is current)"""
+    since = request.args.get('since', type=int)
+    generation = workers.run_blocking(models.get_cache_generation, 'users')
+    
+    if since == generation:
+        return jsonify({'changed': False, 'generation': generation})
+    
+    users = workers.run_blocking(models.get_all_users)
+    fields = ('rfid_uid', 'name', 'student_id', 'email', 'graduating_year',
+              'assigned_task', 'is_approved')
+    return jsonify({
+        'changed': True,
+        'generation': generation,
+        'users': [{field: user[field] for field in fields} for user in users]
+    })
+
+# ============================================================================
+# API Routes - Profiling
+# ============================================================================
+
+@app.route('/api/admin/profile', methods=['GET'])
+@login_required
+def get_profiling():
+    """Get the running capture (if any) and the capture files available"""
+    capture = profiler.active()
+    return jsonify({
+        'active': {'id': capture.id, 'mode': capture.mode, 'until': capture.until} if capture else None,
+        'captures': profiler.list_captures()
+    })
+
+@app.route('/api/admin/profile', methods=['POST'])
+@login_required
+def start_profiling():
+    """Start a profiling capture across web workers and the scanner"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'message': 'Expected a JSON object'}), 400
+    mode = data.get('mode', 'sample')
+    if mode not in profiler.MODES:
+        return jsonify({'success': False, 'message': f"mode must be one of {', '.join(profiler.MODES)}"}), 400
+    seconds = data.get('seconds', 30)
+    if isinstance(seconds, bool) or not isinstance(seconds, (int, float)) or seconds <= 0:
+        return jsonify({'success': False, 'message': 'seconds must be a positive number'}), 400
+    
+    capture_request = workers.run_blocking(profiler.request_capture, mode, seconds)
+    # This worker starts now; other processes pick the request up within PROFILE_POLL_SECONDS
+    profiler.start(capture_request['id'], mode, capture_request['until'] - time.time(), f"web-{os.getpid()}")
+    return jsonify({'success': True, 'capture_id': capture_request['id'], 'until': capture_request['until']})
+
+@app.route('/api/admin/profile/<path:filename>', methods=['GET'])
+@login_required
+def download_profile(filename):
+    """Download a capture file (.pstats for pstats/snakeviz, .collapsed for flamegraph.pl/speedscope)"""
+    if filename not in profiler.list_captures():
+        return jsonify({'success': False, 'message': 'Capture not found'}), 404
+    return send_from_directory(os.path.abspath(config.PROFILE_DIR), filename, as_attachment=True)
+
 # ============================================================================
 # WebSocket Events
 # ============================================================================
@@ -402,30 +590,87 @@ def handle_disconnect():
 # ============================================================================
 
 def auto_checkout_scheduler():
-    """Background task to auto-checkout users at specified time"""
+    """Background task to auto-checkout users at specified time
+    
+    Every worker runs this loop, but only the one holding the
+    'auto_checkout' lease acts on it.
+    """
     while True:
         try:
-            enabled = models.get_setting('auto_checkout_enabled')
-            if enabled == '1':
-                checkout_time = models.get_setting('auto_checkout_time')
-                now = datetime.now()
-                target_time = datetime.strptime(f"{now.strftime('%Y-%m-%d')} {checkout_time}", '%Y-%m-%d %H:%M')
+            if not workers.run_blocking(models.acquire_lease, 'auto_checkout', WORKER_ID, config.LEADER_LEASE_SECONDS):
+                socketio.sleep(60)
+                continue
+            
+            with profiler.profiled():
+                enabled = get_setting('auto_checkout_enabled')
+                if enabled == '1':
+                    checkout_time = get_setting('auto_checkout_time')
+                    now = datetime.now()
+                    target_time = datetime.strptime(f"{now.strftime('%Y-%m-%d')} {checkout_time}", '%Y-%m-%d %H:%M')
                 
-                # Check if it's time to auto-checkout (within 1 minute window)
-                if abs((now - target_time).total_seconds()) < 60:
-                    count = models.auto_checkout_all()
-                    if count > 0:
-                        print(f"Auto-checkout: {count} users checked out at {checkout_time}")
-                        socketio.emit('auto_checkout', {'count': count})
+                    # Check if it's time to auto-checkout (within 1 minute window)
+                    if abs((now - target_time).total_seconds()) < 60:
+                        count = workers.run_blocking(models.auto_checkout_all)
+                        if count > 0:
+                            print(f"Auto-checkout: {count} users checked out at {checkout_time}")
+                            socketio.emit('auto_checkout', {'count': count})
             
-            time.sleep(60)  # Check every minute
+            socketio.sleep(60)  # Check every minute
         except Exception as e:
             print(f"Error in auto-checkout scheduler: {e}")
-            time.sleep(60)
+            socketio.sleep(60)
+
+def backup_scheduler():
+    """Background task to take an online backup every BACKUP_INTERVAL_HOURS"""
+    while True:
+        try:
+            with profiler.profiled():
+                if workers.run_blocking(models.acquire_lease, 'backup', WORKER_ID, config.LEADER_LEASE_SECONDS):
+                    last = backup.last_backup_time()
+                    if last is None or time.time() - last >= config.BACKUP_INTERVAL_HOURS * 3600:
+                        # Runs on a real OS thread so its paced sleeps never stall the event loop
+                        path = workers.run_blocking(backup.run_backup)
+                        print(f"Backup: wrote {path}")
+            
+            socketio.sleep(60)  # Check every minute
+        except Exception as e:
+            print(f"Error in backup scheduler: {e}")
+            socketio.sleep(60)
 
-# Start background scheduler
-scheduler_thread = threading.Thread(target=auto_checkout_scheduler, daemon=True)
-scheduler_thread.start()
+def profile_watcher():
+    """Background task that starts captures requested through another worker"""
+    label = f"web-{os.getpid()}"
+    while True:
+        workers.run_blocking(profiler.poll, label)
+        socketio.sleep(config.PROFILE_POLL_SECONDS)
+
+# ============================================================================
+# Application Factory
+# ============================================================================
+
+_background_started = False
+
+def create_app():
+    """Prepare the database and start background tasks; returns the Flask app
+    
+    Importing this module has no side effects - server.py, `python3 app.py`
+    and any other launcher call this once before serving.
+    """
+    global _background_started
+    if config.REPLICATION_ROLE == 'central' and config.REPLICATION_TOKEN in ('', config.DEFAULT_REPLICATION_TOKEN):
+        # The token guards every user's card UID - never serve it with a guessable one
+        raise RuntimeError("Set ATTENDANCE_REPLICATION_TOKEN to a secret before running as central")
+    models.init_db()  # A single SELECT unless the schema is behind
+    
+    if not _background_started:
+        _background_started = True
+        # Green threads under eventlet/gevent, OS threads otherwise
+        socketio.start_background_task(auto_checkout_scheduler)
+        if config.BACKUP_ENABLED:
+            socketio.start_background_task(backup_scheduler)
+        socketio.start_background_task(profile_watcher)
+    
+    return app
 
 # ============================================================================
 # Run Application
@@ -435,8 +680,10 @@ if __name__ == '__main__':
     print("="*50)
     print("RFID Attendance System - Web Server")
     print("="*50)
-    print(f"Server starting on http://0.0.0.0:5000")
-    print("First time setup: http://0.0.0.0:5000/setup-admin")
+    print(f"Server starting on http://{config.HOST}:{config.PORT}")
+    print(f"First time setup: http://{config.HOST}:{config.PORT}/setup-admin")
+    print("Development server - use server.py for production")
     print("="*50)
     
-    socketio.run(app, host='0.0.0.0', port=5000, debug=config.DEBUG)
+    create_app()
+    socketio.run(app, host=config.HOST, port=config.PORT, debug=config.DEBUG)
@@ -0,0 +1,44 @@
+"""
+Archive old check-ins into per-season database files
+Keeps attendance.db small so taps, backups and VACUUM stay fast; reports
+and user history still read archived seasons transparently
+
+Usage:
+    python3 archive.py                      # archive sessions older than ARCHIVE_KEEP_DAYS
+    python3 archive.py --before 2025-08-01  # archive everything before a date
+    python3 archive.py --vacuum             # also shrink attendance.db afterwards
+"""
+import argparse
+from datetime import datetime, timedelta
+
+import config
+import models
+
+def main():
+    parser = argparse.ArgumentParser(description='Move old check-ins into season archives')
+    parser.add_argument('--before', help='Cutoff date (YYYY-MM-DD); default keeps ARCHIVE_KEEP_DAYS')
+    parser.add_argument('--vacuum', action='store_true', help='VACUUM attendance.db after archiving')
+    args = parser.parse_args()
+
+    if args.before:
+        cutoff = datetime.strptime(args.before, '%Y-%m-%d')
+    else:
+        cutoff = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) \
+            - timedelta(days=config.ARCHIVE_KEEP_DAYS)
+
+    models.init_db()
+    print(f"Archiving closed sessions that started before {cutoff:%Y-%m-%d}...")
+    moved = models.archive_closed_sessions(cutoff)
+
+    if not moved:
+        print("Nothing to archive")
+    for season, count in sorted(moved.items()):
+        print(f"✓ {count} sessions -> {models.archive_path(season)}")
+
+    if args.vacuum and moved:
+        with models.get_db() as conn:
+            conn.execute('VACUUM')
+        print("✓ attendance.db vacuumed")
+
+if __name__ == '__main__':
+    main()
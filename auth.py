@@ -0,0 +1,119 @@
+"""
+Login throttling for RFID Attendance System
+Password hashes are deliberately slow, so unthrottled login attempts can
+pin the Pi's CPU and delay the scanner's check-ins. Attempts are limited by
+token buckets per client IP and per username, and hash checks run on a
+small dedicated pool that refuses work beyond its concurrency cap.
+Buckets live in this process, so each web worker enforces its own limits.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash
+
+import config
+import workers
+
+class HashPoolBusy(Exception):
+    """Every hash slot stayed busy for AUTH_HASH_WAIT seconds"""
+
+class TokenBucketTable:
+    """Bounded per-key token buckets
+
+    Like the scanner's debounce table, buckets are kept in an OrderedDict in
+    last-used order. A bucket idle long enough to have refilled completely
+    is equivalent to no bucket, so those are dropped from the front; when
+    the table is still full, the least recently used key is forgotten.
+    """
+
+    def __init__(self, burst, per_minute, max_keys):
+        self.burst = burst  # Attempts allowed back to back
+        self.rate = per_minute / 60.0  # Tokens regained per second
+        self.refill_time = burst / self.rate  # Idle seconds after which a bucket is full again
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> [tokens, updated_at]
+        self._lock = threading.Lock()
+
+    def _evict(self, now):
+        """Drop fully refilled buckets from the front"""
+        while self._buckets:
+            key, (_, updated_at) = next(iter(self._buckets.items()))
+            if now - updated_at < self.refill_time:
+                break
+            del self._buckets[key]
+
+    def take(self, key, now=None):
+        """Spend a token for key; returns 0 if allowed, else seconds until one is available"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._evict(now)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._buckets.popitem(last=False)
+                bucket = [float(self.burst), now]
+                self._buckets[key] = bucket
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0
+            return (1 - bucket[0]) / self.rate
+
+    def __len__(self):
+        return len(self._buckets)
+
+ip_limiter = TokenBucketTable(config.AUTH_IP_BURST, config.AUTH_IP_PER_MINUTE, config.AUTH_RATE_MAX_KEYS)
+username_limiter = TokenBucketTable(config.AUTH_USER_BURST, config.AUTH_USER_PER_MINUTE, config.AUTH_RATE_MAX_KEYS)
+
+def check_rate_limit(ip, username):
+    """Charge one login attempt; returns 0 if allowed, else seconds to wait"""
+    # Both buckets are charged, so a blocked IP still counts against the username
+    ip_wait = ip_limiter.take(ip or '')
+    username_wait = username_limiter.take((username or '').strip().lower())
+    return max(ip_wait, username_wait)
+
+# ============================================================================
+# Password verification
+# ============================================================================
+
+_pool = None
+_pool_lock = threading.Lock()
+_hash_slots = None
+
+def _get_hash_slots():
+    """Semaphore capping how many hash checks run at once"""
+    global _hash_slots
+    if _hash_slots is None:
+        with _pool_lock:
+            if _hash_slots is None:
+                _hash_slots = threading.BoundedSemaphore(config.AUTH_HASH_WORKERS)
+    return _hash_slots
+
+def _get_pool():
+    """Create the hash pool on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=config.AUTH_HASH_WORKERS,
+                                           thread_name_prefix='auth-hash')
+    return _pool
+
+def verify_password(password_hash, password):
+    """Check a password on the hash pool; raises HashPoolBusy if no slot frees up in time"""
+    slots = _get_hash_slots()
+    if not slots.acquire(timeout=config.AUTH_HASH_WAIT):
+        raise HashPoolBusy()
+    try:
+        if config.ASYNC_MODE in ('eventlet', 'gevent'):
+            # Only real OS threads keep the hub responsive; the semaphore still caps the work
+            return workers.run_blocking(check_password_hash, password_hash, password)
+        return _get_pool().submit(check_password_hash, password_hash, password).result()
+    finally:
+        slots.release()
@@ -0,0 +1,172 @@
+"""
+Online backup and restore of attendance.db and its season archives
+Copies the live databases without stopping the scanner or web app, either
+with SQLite's backup API a few pages at a time or with VACUUM INTO. Each
+backup is a directory holding attendance.db plus archive/attendance-<season>.db,
+rotated and restored as one set.
+
+Usage:
+    python3 backup.py                     # take a backup now
+    python3 backup.py list                # show available backups
+    python3 backup.py restore <backup>    # restore a backup set (or a single-file backup)
+"""
+import argparse
+import glob
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+
+import config
+import models
+
+def _paced_progress():
+    """Progress callback that sleeps between steps to leave the database to taps
+
+    SQLite restarts the copy if another connection writes mid-backup; after
+    BACKUP_MAX_RESTARTS restarts we stop sleeping so the copy can finish.
+    """
+    state = {'remaining': None, 'restarts': 0}
+
+    def progress(status, remaining, total):
+        if state['remaining'] is not None and remaining > state['remaining']:
+            state['restarts'] += 1
+        state['remaining'] = remaining
+        if state['restarts'] < config.BACKUP_MAX_RESTARTS:
+            time.sleep(config.BACKUP_STEP_SLEEP)
+
+    return progress
+
+def list_backups():
+    """Backup sets (and older single-file backups), newest first"""
+    return sorted((path for path in glob.glob(os.path.join(config.BACKUP_DIR, 'attendance-*'))
+                   if not path.endswith('.partial')), reverse=True)
+
+def _remove(path):
+    """Delete a backup set directory or a single-file backup"""
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    else:
+        os.remove(path)
+
+def rotate_backups():
+    """Delete all but the newest BACKUP_RETENTION backups; returns removed paths"""
+    removed = list_backups()[config.BACKUP_RETENTION:]
+    for path in removed:
+        _remove(path)
+    return removed
+
+def _copy_database(source_path, dest_path, method):
+    """Copy one live database file to dest_path without blocking its writers"""
+    source = sqlite3.connect(source_path)
+    try:
+        if method == 'vacuum':
+            source.execute('VACUUM INTO ?', (dest_path,))
+        else:
+            dest = sqlite3.connect(dest_path)
+            try:
+                source.backup(dest, pages=config.BACKUP_PAGES_PER_STEP, progress=_paced_progress())
+            finally:
+                dest.close()
+    finally:
+        source.close()
+
+def run_backup(method=None):
+    """Back up the live database and every season archive to a new set in BACKUP_DIR
+
+    Rotates old sets and returns the new set's directory. attendance.db is
+    copied first: a session archived mid-backup can then only appear twice
+    (which restore_backup reconciles), never go missing.
+    """
+    method = method or config.BACKUP_METHOD
+    path = os.path.join(config.BACKUP_DIR, f"attendance-{datetime.now():%Y%m%d-%H%M%S}")
+    partial = path + '.partial'
+    if os.path.exists(partial):
+        shutil.rmtree(partial)
+    os.makedirs(os.path.join(partial, 'archive'))
+
+    _copy_database(models.DATABASE_PATH, os.path.join(partial, 'attendance.db'), method)
+    for season in models.list_archive_seasons():
+        _copy_database(models.archive_path(season),
+                       os.path.join(partial, 'archive', f"attendance-{season}.db"), method)
+
+    # Only complete sets ever carry the final name
+    if os.path.exists(path):
+        _remove(path)
+    os.replace(partial, path)
+    rotate_backups()
+    return path
+
+def last_backup_time():
+    """Modification time of the newest backup, or None"""
+    backups = list_backups()
+    return os.path.getmtime(backups[0]) if backups else None
+
+def _restore_database(source_path, dest_path):
+    """Overwrite dest_path with a backup copy (other connections wait on SQLite's lock)"""
+    source = sqlite3.connect(f"file:{source_path}?mode=ro", uri=True)
+    dest = sqlite3.connect(dest_path)
+    try:
+        source.backup(dest)
+    finally:
+        dest.close()
+        source.close()
+
+def restore_backup(path):
+    """Restore attendance.db and the season archives from a backup set
+
+    Live archive files that are not part of the set (archived after the
+    backup was taken) are moved aside into ARCHIVE_DIR/replaced-<time>/ so
+    their sessions, which the restored attendance.db still holds, are not
+    counted twice. A single-file backup from before sets only restores
+    attendance.db.
+    """
+    if not os.path.isdir(path):
+        _restore_database(path, models.DATABASE_PATH)
+        return
+
+    _restore_database(os.path.join(path, 'attendance.db'), models.DATABASE_PATH)
+
+    backed_up = {os.path.basename(archive)[len('attendance-'):-len('.db')]: archive
+                 for archive in glob.glob(os.path.join(path, 'archive', 'attendance-*.db'))}
+    stale = [season for season in models.list_archive_seasons() if season not in backed_up]
+    if stale:
+        aside = os.path.join(config.ARCHIVE_DIR, f"replaced-{datetime.now():%Y%m%d-%H%M%S}")
+        os.makedirs(aside, exist_ok=True)
+        for season in stale:
+            os.replace(models.archive_path(season), os.path.join(aside, os.path.basename(models.archive_path(season))))
+    if backed_up:
+        os.makedirs(config.ARCHIVE_DIR, exist_ok=True)
+    for season, archive in backed_up.items():
+        _restore_database(archive, models.archive_path(season))
+
+    models.drop_archived_duplicates()
+
+def main():
+    parser = argparse.ArgumentParser(description='Back up or restore attendance.db')
+    sub = parser.add_subparsers(dest='command')
+    backup = sub.add_parser('backup', help='Take a backup now (default)')
+    backup.add_argument('--method', choices=['incremental', 'vacuum'])
+    sub.add_parser('list', help='List backups')
+    restore = sub.add_parser('restore', help='Restore a backup into attendance.db and the archives')
+    restore.add_argument('path')
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        for path in list_backups():
+            files = [path] if os.path.isfile(path) else glob.glob(os.path.join(path, '**', '*.db'), recursive=True)
+            print(f"{path}  {sum(os.path.getsize(f) for f in files) / 1024:.0f} KB")
+    elif args.command == 'restore':
+        if not os.path.exists(args.path):
+            print(f"Backup not found: {args.path}")
+            raise SystemExit(1)
+        restore_backup(args.path)
+        print(f"✓ Restored {args.path} into {models.DATABASE_PATH}")
+    else:
+        start = time.time()
+        path = run_backup(getattr(args, 'method', None))
+        print(f"✓ Backup written to {path} in {time.time() - start:.1f}s")
+
+if __name__ == '__main__':
+    main()
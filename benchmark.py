@@ -0,0 +1,225 @@
+"""
+Benchmarks for RFID Attendance System
+
+Usage:
+    python3 benchmark.py server [--url http://localhost:5000] [--displays 200]
+                                [--clients 20] [--duration 30]
+    python3 benchmark.py backup [--rows 200000] [--duration 10]
+    python3 benchmark.py startup [--runs 10]
+
+server: opens many Socket.IO connections (display kiosks) against a running
+server, then hammers /api/checkin/current from HTTP clients and reports how
+many displays stayed connected and the request throughput/latency.
+
+backup: builds a scratch database, then measures check-in/check-out latency
+with no backup running and again while online backups run back to back.
+
+startup: times fresh interpreter starts of the web app (import + create_app)
+and the scanner (import + RFIDScanner) against an already-migrated database.
+"""
+import argparse
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+def _percentile(samples, pct):
+    """Return the pct-th percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+    return ordered[index]
+
+def _print_latency(label, samples):
+    """Print a one-line latency summary in milliseconds"""
+    if not samples:
+        print(f"{label}: no samples")
+        return
+    print(f"{label}: n={len(samples)} "
+          f"mean={statistics.mean(samples) * 1000:.2f}ms "
+          f"p50={_percentile(samples, 50) * 1000:.2f}ms "
+          f"p99={_percentile(samples, 99) * 1000:.2f}ms")
+
+# ============================================================================
+# Server throughput / concurrent displays
+# ============================================================================
+
+def bench_server(args):
+    """Measure concurrent displays and HTTP throughput against a running server"""
+    import socketio  # python-socketio[client]
+
+    displays = []
+    for _ in range(args.displays):
+        client = socketio.Client(reconnection=False)
+        try:
+            client.connect(args.url, transports=['websocket'])
+            displays.append(client)
+        except Exception as e:
+            print(f"Display connect failed after {len(displays)}: {e}")
+            break
+    print(f"Displays connected: {len(displays)}/{args.displays}")
+
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.time() + args.duration
+
+    def http_client():
+        while time.time() < deadline:
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(f"{args.url}/api/checkin/current", timeout=10) as resp:
+                    resp.read()
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+            except Exception:
+                with lock:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=http_client) for _ in range(args.clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    still_connected = sum(1 for c in displays if c.connected)
+    print(f"Displays still connected: {still_connected}/{len(displays)}")
+    print(f"Throughput: {len(latencies) / args.duration:.1f} req/s  errors: {errors[0]}")
+    _print_latency("Request latency", latencies)
+
+    for client in displays:
+        client.disconnect()
+
+# ============================================================================
+# Tap latency during online backup
+# ============================================================================
+
+def _use_scratch_database(directory):
+    """Point models (and backups) at a throwaway database in directory"""
+    import config
+    import models
+    config.DATABASE_PATH = models.DATABASE_PATH = os.path.join(directory, 'attendance.db')
+    config.BACKUP_DIR = os.path.join(directory, 'backups')
+    config.ARCHIVE_DIR = os.path.join(directory, 'archive')
+    models.init_db()
+    return models
+
+def _seed_history(models, users, rows):
+    """Create users and closed check-in history"""
+    with models.get_db() as conn:
+        conn.executemany(
+            'INSERT INTO users (rfid_uid, name, student_id, email, graduating_year, is_approved) '
+            'VALUES (?, ?, ?, ?, ?, 1)',
+            [(f"uid{i}", f"User {i}", f"S{i}", f"user{i}@example.com", 2025 + i % 4) for i in range(users)]
+        )
+        conn.executemany(
+            'INSERT INTO checkins (user_id, check_in_time, check_out_time) VALUES (?, ?, ?)',
+            [(1 + i % users, f"2025-{1 + i % 12:02d}-{1 + i % 28:02d} 15:00:00.000001",
+              f"2025-{1 + i % 12:02d}-{1 + i % 28:02d} 17:00:00.000001") for i in range(rows)]
+        )
+
+def _measure_taps(models, users, duration):
+    """Toggle random users in/out for duration seconds; returns per-tap latencies"""
+    latencies = []
+    deadline = time.time() + duration
+    while time.time() < deadline:
+        user_id = random.randint(1, users)
+        start = time.perf_counter()
+        if models.get_user_status(user_id):
+            models.check_out(user_id)
+        else:
+            models.check_in(user_id)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def bench_backup(args):
+    """Compare tap latency with and without concurrent online backups"""
+    import backup
+
+    with tempfile.TemporaryDirectory() as directory:
+        models = _use_scratch_database(directory)
+        _seed_history(models, args.users, args.rows)
+        size_mb = os.path.getsize(models.DATABASE_PATH) / 1024 / 1024
+        print(f"Scratch database: {args.rows} check-ins, {size_mb:.1f} MB")
+
+        _print_latency("Taps, no backup", _measure_taps(models, args.users, args.duration))
+
+        running = threading.Event()
+        running.set()
+        backups = [0]
+
+        def backup_loop():
+            while running.is_set():
+                backup.run_backup(args.method)
+                backups[0] += 1
+
+        thread = threading.Thread(target=backup_loop)
+        thread.start()
+        latencies = _measure_taps(models, args.users, args.duration)
+        running.clear()
+        thread.join()
+        _print_latency(f"Taps, during {backups[0]} {args.method or 'default'} backups", latencies)
+
+# ============================================================================
+# Startup time
+# ============================================================================
+
+STARTUP_TARGETS = {
+    'app.py': 'import app; app.create_app()',
+    'rfid_scanner.py': 'import models, rfid_scanner; models.init_db(); rfid_scanner.RFIDScanner()',
+}
+
+def bench_startup(args):
+    """Time cold process starts until each entry point is ready to serve/scan"""
+    root = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ,
+                   ATTENDANCE_DB=os.path.join(directory, 'attendance.db'),
+                   ATTENDANCE_ARCHIVE_DIR=os.path.join(directory, 'archive'),
+                   ATTENDANCE_BACKUP_DIR=os.path.join(directory, 'backups'))
+        # First run migrates the scratch database; later runs hit the fast path
+        subprocess.run([sys.executable, '-c', 'import models; models.init_db()'],
+                       cwd=root, env=env, check=True, stdout=subprocess.DEVNULL)
+
+        for name, code in STARTUP_TARGETS.items():
+            samples = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                subprocess.run([sys.executable, '-c', code], cwd=root, env=env, check=True,
+                               stdout=subprocess.DEVNULL)
+                samples.append(time.perf_counter() - start)
+            _print_latency(f"Startup {name}", samples)
+
+def main():
+    parser = argparse.ArgumentParser(description='RFID Attendance benchmarks')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    server = sub.add_parser('server', help='Concurrent displays and request throughput')
+    server.add_argument('--url', default='http://localhost:5000')
+    server.add_argument('--displays', type=int, default=200)
+    server.add_argument('--clients', type=int, default=20)
+    server.add_argument('--duration', type=int, default=30)
+    server.set_defaults(func=bench_server)
+
+    backup = sub.add_parser('backup', help='Tap latency during online backups')
+    backup.add_argument('--rows', type=int, default=200000)
+    backup.add_argument('--users', type=int, default=150)
+    backup.add_argument('--duration', type=int, default=10)
+    backup.add_argument('--method', choices=['incremental', 'vacuum'])
+    backup.set_defaults(func=bench_backup)
+
+    startup = sub.add_parser('startup', help='Process start until ready')
+    startup.add_argument('--runs', type=int, default=10)
+    startup.set_defaults(func=bench_startup)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Process-local caches shared safely between web worker processes
+Each cache has a generation counter in SQLite that writers bump in the
+same transaction as their change; readers re-check it at most once per
+CACHE_CHECK_INTERVAL and drop their local copy when it moves
+"""
+import threading
+import time
+
+import config
+import models
+
+class SharedCache:
+    def __init__(self, name, check_interval=None):
+        self.name = name
+        self.check_interval = config.CACHE_CHECK_INTERVAL if check_interval is None else check_interval
+        self._values = {}
+        self._generation = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        """Drop local entries if another worker bumped the generation"""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        generation = models.get_cache_generation(self.name)
+        with self._lock:
+            if generation != self._generation:
+                self._values.clear()
+                self._generation = generation
+            self._checked_at = now
+
+    def get(self, key, loader):
+        """Return the cached value for key, calling loader(key) on a miss"""
+        self._refresh()
+        with self._lock:
+            if key in self._values:
+                return self._values[key]
+        value = loader(key)
+        with self._lock:
+            self._values[key] = value
+        return value
+
+    def invalidate(self):
+        """Drop local entries now (other workers notice the bumped generation)"""
+        with self._lock:
+            self._values.clear()
+            self._checked_at = 0.0
@@ -2,17 +2,78 @@
 Configuration for RFID Attendance System
 """
 import os
+import socket
 
 # Flask Configuration
 SECRET_KEY = os.urandom(24)  # Change this to a fixed key in production
 DEBUG = True
 
+# Web server
+HOST = '0.0.0.0'
+PORT = 5000
+# 'threading' is the development server; server.py switches to 'eventlet' or 'gevent'
+ASYNC_MODE = os.environ.get('ATTENDANCE_ASYNC_MODE', 'threading')
+WORKER_CONNECTIONS = 1000  # Max concurrent connections (displays + admins) in production mode
+DB_POOL_WORKERS = 4  # OS threads for blocking DB/report work
+
+# Report engine
+REPORT_JOB_WORKERS = 2  # Background range reports computed at once
+REPORT_JOB_QUEUE = 8  # Jobs queued or running before new ones are refused
+REPORT_JOB_HISTORY = 50  # Finished jobs kept for status polling
+REPORT_CHUNK_DAYS = 31  # Days fetched per query when building long ranges
+
+# Login throttling (per web worker process)
+AUTH_IP_BURST = 10  # Login attempts one client IP may make back to back
+AUTH_IP_PER_MINUTE = 10  # ...then this many per minute
+AUTH_USER_BURST = 5  # Same, per username
+AUTH_USER_PER_MINUTE = 3
+AUTH_RATE_MAX_KEYS = 4096  # IPs/usernames tracked before the least recent are forgotten
+AUTH_HASH_WORKERS = 1  # Password hash checks run at once (leaves CPU for the scanner)
+AUTH_HASH_WAIT = 2.0  # Seconds a login waits for a free hash slot before a 503
+
+# Multi-process web tier
+# None = single process; 'redis://host:6379/0' or 'unix:///tmp/attendance-bus.sock'
+# (local broker started with: python3 message_bus.py)
+SOCKETIO_MESSAGE_QUEUE = os.environ.get('ATTENDANCE_MESSAGE_QUEUE')
+LEADER_LEASE_SECONDS = 180  # Scheduler leadership expires if the leader stops renewing
+CACHE_CHECK_INTERVAL = 1.0  # Seconds between cross-worker cache generation checks
+
 # Database
-DATABASE_PATH = 'attendance.db'
+DATABASE_PATH = os.environ.get('ATTENDANCE_DB', 'attendance.db')
+
+# Archival of old check-ins into per-season files
+ARCHIVE_DIR = os.environ.get('ATTENDANCE_ARCHIVE_DIR', 'archive')
+ARCHIVE_KEEP_DAYS = 180  # archive.py keeps this many days of closed sessions hot by default
+SEASON_START_MONTH = 8  # Seasons run August-July, e.g. '2025-2026'
+
+# Online backups (run by app.py in the background, or: python3 backup.py)
+BACKUP_ENABLED = True
+BACKUP_DIR = os.environ.get('ATTENDANCE_BACKUP_DIR', 'backups')
+BACKUP_INTERVAL_HOURS = 24
+BACKUP_RETENTION = 14  # Newest backups to keep
+BACKUP_METHOD = 'incremental'  # 'incremental' (paced backup API) or 'vacuum' (VACUUM INTO, compacted)
+BACKUP_PAGES_PER_STEP = 64  # Pages copied per backup step
+BACKUP_STEP_SLEEP = 0.01  # Seconds to sleep between steps so taps get the database
+BACKUP_MAX_RESTARTS = 5  # Stop pacing after SQLite restarts the copy this many times
+
+# Multi-site replication
+# 'standalone', 'node' (scanner Pi that syncs to a central server) or 'central'
+REPLICATION_ROLE = os.environ.get('ATTENDANCE_REPLICATION_ROLE', 'standalone')
+NODE_ID = os.environ.get('ATTENDANCE_NODE_ID', socket.gethostname())
+CENTRAL_URL = os.environ.get('ATTENDANCE_CENTRAL_URL', 'http://localhost:5000')
+DEFAULT_REPLICATION_TOKEN = 'change-me'
+REPLICATION_TOKEN = os.environ.get('ATTENDANCE_REPLICATION_TOKEN', DEFAULT_REPLICATION_TOKEN)  # Shared secret (required for central/node)
+REPLICATION_BATCH_SIZE = 200  # Outbox events per sync request
+REPLICATION_INTERVAL = 10  # Seconds between syncs
 
 # RFID Scanner Settings
 RFID_ENABLED = True  # Set to False for testing without hardware
 RFID_SCAN_INTERVAL = 0.3  # Seconds between scans
+RFID_PROBE_FIRMWARE = False  # Read PN532 firmware version at startup (slower, for wiring checks)
+RFID_DEBOUNCE_SECONDS = 2  # Same card cannot toggle again within this window
+RFID_HOLD_GAP = 1.0  # Reads closer together than this mean the card is still on the reader
+RFID_DEBOUNCE_MAX_CARDS = 1024  # Cards remembered by the debounce table
+RFID_MIN_SESSION_SECONDS = 60  # A tap this soon after checking in does not check out
 
 # Auto-checkout settings
 AUTO_CHECKOUT_TIME = "17:00"  # 5:00 PM
@@ -22,6 +83,12 @@ AUTO_CHECKOUT_ENABLED = True
 MAX_OCCUPANCY = 30
 SESSION_TIMEOUT = 3600  # 1 hour in seconds
 
+# On-demand profiling (admin panel -> /api/admin/profile)
+PROFILE_DIR = 'profiles'
+PROFILE_MAX_SECONDS = 300  # Longest capture window allowed
+PROFILE_SAMPLE_INTERVAL = 0.01  # Seconds between stack samples in 'sample' mode
+PROFILE_POLL_SECONDS = 5  # How often each process checks for a capture request
+
 # Audio/Visual feedback (for future hardware integration)
 BEEP_ON_SCAN = True
 LED_FEEDBACK = True
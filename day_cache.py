@@ -0,0 +1,41 @@
+"""
+Per-day result cache shared by analytics and the report engine
+Days before today can no longer change, so their computed payloads are
+stored in the day_cache table (edits to past days invalidate them). Only
+the days missing from the cache are computed, from one contiguous run.
+"""
+import json
+from datetime import datetime, timedelta
+
+import models
+
+def days_between(first_day, last_day):
+    """Every date from first_day to last_day inclusive"""
+    days = []
+    day = first_day
+    while day <= last_day:
+        days.append(day)
+        day += timedelta(days=1)
+    return days
+
+def cached_per_day(kind, days, compute, today=None):
+    """Per-day payloads for days, computing (and caching completed days) only what is missing
+
+    compute(first_day, last_day) must return a dict of 'YYYY-MM-DD' -> payload.
+    """
+    today = (today or datetime.now().date()).strftime('%Y-%m-%d')
+    keys = [day.strftime('%Y-%m-%d') for day in days]
+    closed = [key for key in keys if key < today]
+    payloads = {key: json.loads(payload)
+                for key, payload in models.get_cached_days(kind, closed).items()}
+
+    missing = [day for day, key in zip(days, keys) if key not in payloads]
+    if missing:
+        computed = compute(missing[0], missing[-1])
+        fresh = {key: value for key, value in computed.items() if key not in payloads}
+        payloads.update(fresh)
+        models.store_cached_days(kind, {
+            key: json.dumps(value) for key, value in fresh.items() if key < today
+        })
+
+    return [payloads[key] for key in keys]
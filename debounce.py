@@ -0,0 +1,69 @@
+"""
+Per-card debounce and anti-passback for the RFID scan loop
+Tracks every recently seen card separately, so interleaved taps (A, B, A)
+cannot toggle A twice, and a card left on the reader fires only once
+"""
+from collections import OrderedDict
+
+ACCEPT = 'accept'  # New tap - check in/out
+COOLDOWN = 'cooldown'  # Same card re-presented within the cooldown
+HELD = 'held'  # Card still on the reader since its last accepted tap
+
+class _CardState:
+    __slots__ = ('last_seen', 'last_accepted')
+
+    def __init__(self, now):
+        self.last_seen = now
+        self.last_accepted = None
+
+class DebounceTable:
+    """Bounded per-card scan state with TTL eviction
+
+    Entries are kept in an OrderedDict in last-seen order: each read moves
+    its card to the end, so the stalest cards are always at the front and
+    eviction only ever pops from there. Every check is O(1) amortized.
+    """
+
+    def __init__(self, cooldown, hold_gap, max_cards):
+        self.cooldown = cooldown  # Seconds before the same card may fire again
+        self.hold_gap = hold_gap  # Reads closer together than this mean the card never left
+        self.ttl = max(cooldown, hold_gap)  # After this, a card's state no longer matters
+        self.max_cards = max_cards
+        self._cards = OrderedDict()
+
+    def _evict(self, now):
+        """Drop expired cards from the front"""
+        while self._cards:
+            uid, state = next(iter(self._cards.items()))
+            if now - state.last_seen <= self.ttl:
+                break
+            del self._cards[uid]
+
+    def check(self, uid, now):
+        """Classify a read of uid at monotonic time now as ACCEPT, COOLDOWN or HELD"""
+        self._evict(now)
+        state = self._cards.get(uid)
+        if state is None:
+            # Full of live cards - forget the one seen longest ago
+            if len(self._cards) >= self.max_cards:
+                self._cards.popitem(last=False)
+            state = _CardState(now)
+            self._cards[uid] = state
+            verdict = ACCEPT
+        else:
+            self._cards.move_to_end(uid)
+            held = now - state.last_seen <= self.hold_gap
+            if held and state.last_accepted is not None:
+                verdict = HELD
+            elif state.last_accepted is not None and now - state.last_accepted < self.cooldown:
+                verdict = COOLDOWN
+            else:
+                verdict = ACCEPT
+            state.last_seen = now
+
+        if verdict == ACCEPT:
+            state.last_accepted = now
+        return verdict
+
+    def __len__(self):
+        return len(self._cards)
@@ -0,0 +1,143 @@
+"""
+Local Socket.IO message bus for running several web workers on one Pi
+UnixSocketManager relays socketio.emit calls between worker processes via a
+tiny Unix-socket broker, as a stand-in for Redis when testing scale-out
+
+Usage:
+    python3 message_bus.py [--path /tmp/attendance-bus.sock]
+    ATTENDANCE_MESSAGE_QUEUE=unix:///tmp/attendance-bus.sock python3 server.py --port 5001
+"""
+import argparse
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+
+import socketio
+
+DEFAULT_PATH = '/tmp/attendance-bus.sock'
+
+# ============================================================================
+# Client manager (used by each web worker)
+# ============================================================================
+
+class UnixSocketManager(socketio.PubSubManager):
+    """Socket.IO client manager that publishes through the local broker"""
+    name = 'unixsocket'
+
+    def __init__(self, url='unix://' + DEFAULT_PATH, channel='socketio',
+                 write_only=False, logger=None):
+        self.path = url[len('unix://'):] if url.startswith('unix://') else url
+        self._publisher = None
+        self._publish_lock = threading.Lock()
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(self.path)
+        return sock
+
+    def _publish(self, data):
+        line = (json.dumps({'channel': self.channel, 'data': data}) + '\n').encode()
+        with self._publish_lock:
+            for _ in range(2):
+                try:
+                    if self._publisher is None:
+                        self._publisher = self._connect()
+                    self._publisher.sendall(line)
+                    return
+                except OSError:
+                    # Broker restarted - reconnect once and retry
+                    self._publisher = None
+        print(f"Message bus: could not publish to {self.path}")
+
+    def _listen(self):
+        while True:
+            sock = None
+            try:
+                sock = self._connect()
+                sock.sendall(f"SUBSCRIBE {self.channel}\n".encode())
+                with sock.makefile('rb') as stream:
+                    for line in stream:
+                        message = json.loads(line)
+                        if message.get('channel') == self.channel:
+                            yield message['data']
+            except OSError as e:
+                print(f"Message bus: connection lost ({e}), retrying")
+            finally:
+                if sock is not None:
+                    sock.close()
+            time.sleep(1)  # Green under eventlet/gevent monkey patching
+
+# ============================================================================
+# Broker
+# ============================================================================
+
+class _BrokerHandler(socketserver.StreamRequestHandler):
+    """One connection: either a subscriber or a publisher"""
+
+    def handle(self):
+        first = self.rfile.readline()
+        if first.startswith(b'SUBSCRIBE '):
+            self.server.add_subscriber(self.wfile)
+            try:
+                # Block until the subscriber disconnects
+                while self.rfile.readline():
+                    pass
+            finally:
+                self.server.remove_subscriber(self.wfile)
+            return
+
+        line = first
+        while line:
+            self.server.broadcast(line)
+            line = self.rfile.readline()
+
+class Broker(socketserver.ThreadingUnixStreamServer):
+    """Fan every published line out to all subscribers (including the sender's)"""
+    daemon_threads = True
+
+    def __init__(self, path):
+        if os.path.exists(path):
+            os.unlink(path)
+        super().__init__(path, _BrokerHandler)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def add_subscriber(self, stream):
+        with self._lock:
+            self._subscribers.add(stream)
+
+    def remove_subscriber(self, stream):
+        with self._lock:
+            self._subscribers.discard(stream)
+
+    def broadcast(self, line):
+        # Hold the lock while writing so lines from concurrent publishers never interleave
+        with self._lock:
+            for stream in list(self._subscribers):
+                try:
+                    stream.write(line)
+                    stream.flush()
+                except OSError:
+                    self._subscribers.discard(stream)
+
+def main():
+    parser = argparse.ArgumentParser(description='Local Socket.IO message broker')
+    parser.add_argument('--path', default=DEFAULT_PATH)
+    args = parser.parse_args()
+
+    broker = Broker(args.path)
+    print(f"Message bus listening on unix://{args.path}")
+    try:
+        broker.serve_forever()
+    except KeyboardInterrupt:
+        print("Message bus stopped")
+    finally:
+        broker.server_close()
+        os.unlink(args.path)
+
+if __name__ == '__main__':
+    main()
@@ -2,16 +2,25 @@
 Database models for RFID Attendance System
 """
 import sqlite3
+import os
+import glob
+import time
 from datetime import datetime
 from contextlib import contextmanager
 
-DATABASE_PATH = 'attendance.db'
+import config
+
+DATABASE_PATH = config.DATABASE_PATH
+
+# Column list shared by the hot checkins table and per-season archive files
+CHECKIN_COLUMNS = 'id, user_id, check_in_time, check_out_time, auto_checkout, node_id'
 
 @contextmanager
 def get_db():
     """Context manager for database connections"""
     conn = sqlite3.connect(DATABASE_PATH)
     conn.row_factory = sqlite3.Row
+    conn.create_function('season_for', 1, season_for, deterministic=True)
     try:
         yield conn
         conn.commit()
@@ -21,73 +30,210 @@ def get_db():
     finally:
         conn.close()
 
+# Schema migrations - each runs once, in order, when the stored version is behind
+def _migration_base_schema(cursor):
+    """Users, check-ins, admins and settings"""
+    # Users table - stores card assignments
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            rfid_uid TEXT UNIQUE NOT NULL,
+            name TEXT NOT NULL,
+            student_id TEXT UNIQUE NOT NULL,
+            email TEXT NOT NULL,
+            graduating_year INTEGER NOT NULL,
+            assigned_task TEXT DEFAULT 'No task assigned',
+            is_approved BOOLEAN DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Check-ins table - tracks all check-in/out events
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS checkins (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            check_in_time TIMESTAMP NOT NULL,
+            check_out_time TIMESTAMP,
+            auto_checkout BOOLEAN DEFAULT 0,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    ''')
+    
+    # Admins table - for authentication
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS admins (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            full_name TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Settings table - for system configuration
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    ''')
+    
+    # Insert default settings
+    cursor.execute('''
+        INSERT OR IGNORE INTO settings (key, value) 
+        VALUES ('max_occupancy', '30'),
+               ('auto_checkout_time', '17:00'),
+               ('auto_checkout_enabled', '1')
+    ''')
+    
+    # Create indexes for performance
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_rfid_uid ON users(rfid_uid)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_student_id ON users(student_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_checkin_user ON checkins(user_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_checkin_time ON checkins(check_in_time)')
+
+def _migration_multiprocess(cursor):
+    """Leader election leases and cross-worker cache generations"""
+    # Leases table - leader election between web worker processes
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS leases (
+            name TEXT PRIMARY KEY,
+            holder TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )
+    ''')
+    
+    # Cache generations - bumped on writes so other workers drop stale caches
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cache_generations (
+            name TEXT PRIMARY KEY,
+            generation INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+
+def _migration_replication(cursor):
+    """Node outbox and central idempotency tracking"""
+    cursor.execute('PRAGMA table_info(checkins)')
+    if 'node_id' not in [row['name'] for row in cursor.fetchall()]:
+        cursor.execute('ALTER TABLE checkins ADD COLUMN node_id TEXT')
+    
+    # Outbox - check-in/out events a scanner node has not yet synced to central
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS outbox (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_type TEXT NOT NULL,
+            student_id TEXT NOT NULL,
+            event_time TIMESTAMP NOT NULL
+        )
+    ''')
+    
+    # Replicated events - (node, seq) pairs central has applied, for idempotency
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS replicated_events (
+            node_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (node_id, seq)
+        )
+    ''')
+
+def _migration_open_session_index(cursor):
+    """Tap path and live display only look at open sessions - keep that lookup independent of history size"""
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_checkin_open ON checkins(user_id)
+        WHERE check_out_time IS NULL
+    ''')
+
+def _migration_member_hours(cursor):
+    """Running per-member totals, backfilled from hot and archived history"""
+    # Member hours - lifetime ('lifetime') and per-season totals, updated on every check-out
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS member_hours (
+            user_id INTEGER NOT NULL,
+            season TEXT NOT NULL,
+            total_minutes REAL NOT NULL DEFAULT 0,
+            session_count INTEGER NOT NULL DEFAULT 0,
+            last_seen TIMESTAMP,
+            PRIMARY KEY (user_id, season)
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_member_hours_rank ON member_hours(season, total_minutes DESC)
+    ''')
+    
+    cursor.execute('DELETE FROM member_hours')
+    _credit_member_hours(cursor, '1', ())
+    # ATTACH is not allowed mid-transaction, so read archives on their own connections
+    for season in list_archive_seasons():
+        archive = sqlite3.connect(archive_path(season))
+        archive.row_factory = sqlite3.Row
+        try:
+            totals = archive.execute(_session_totals_sql('checkins', '1', '?'), (season,)).fetchall()
+        finally:
+            archive.close()
+        _apply_member_hours(cursor, totals)
+
+def _migration_day_cache(cursor):
+    """Per-day cache for analytics of days that can no longer change"""
+    # Day cache - JSON results keyed by (kind, day), only for completed days
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS day_cache (
+            kind TEXT NOT NULL,
+            day TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (kind, day)
+        )
+    ''')
+    # Lets interval queries find sessions that end after a point in time
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_checkin_out ON checkins(check_out_time)')
+
+SCHEMA_MIGRATIONS = [
+    _migration_base_schema,
+    _migration_multiprocess,
+    _migration_replication,
+    _migration_open_session_index,
+    _migration_member_hours,
+    _migration_day_cache,
+]
+SCHEMA_VERSION = len(SCHEMA_MIGRATIONS)
+
+def _get_schema_version(cursor):
+    """Stored schema version (0 for a new or pre-versioning database)"""
+    try:
+        cursor.execute('SELECT version FROM schema_version')
+    except sqlite3.OperationalError:
+        return 0
+    row = cursor.fetchone()
+    return row['version'] if row else 0
+
 def init_db():
-    """Initialize database with required tables"""
+    """Bring the database schema up to date
+    
+    Costs a single SELECT when the schema is current, so it is cheap to call
+    on every start. Returns True if migrations ran.
+    """
     with get_db() as conn:
         cursor = conn.cursor()
+        if _get_schema_version(cursor) >= SCHEMA_VERSION:
+            return False
         
-        # Users table - stores card assignments
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                rfid_uid TEXT UNIQUE NOT NULL,
-                name TEXT NOT NULL,
-                student_id TEXT UNIQUE NOT NULL,
-                email TEXT NOT NULL,
-                graduating_year INTEGER NOT NULL,
-                assigned_task TEXT DEFAULT 'No task assigned',
-                is_approved BOOLEAN DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+        # WAL lets the scanner, web app and online backups read while another writes
+        cursor.execute('PRAGMA journal_mode=WAL')
         
-        # Check-ins table - tracks all check-in/out events
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS checkins (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                check_in_time TIMESTAMP NOT NULL,
-                check_out_time TIMESTAMP,
-                auto_checkout BOOLEAN DEFAULT 0,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            )
-        ''')
-        
-        # Admins table - for authentication
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS admins (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                full_name TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Settings table - for system configuration
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS settings (
-                key TEXT PRIMARY KEY,
-                value TEXT NOT NULL
-            )
-        ''')
-        
-        # Insert default settings
-        cursor.execute('''
-            INSERT OR IGNORE INTO settings (key, value) 
-            VALUES ('max_occupancy', '30'),
-                   ('auto_checkout_time', '17:00'),
-                   ('auto_checkout_enabled', '1')
-        ''')
-        
-        # Create indexes for performance
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_rfid_uid ON users(rfid_uid)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_student_id ON users(student_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_checkin_user ON checkins(user_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_checkin_time ON checkins(check_in_time)')
+        # Another process may be migrating too - take the write lock, then re-check
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute('CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)')
+        version = _get_schema_version(cursor)
+        for migration in SCHEMA_MIGRATIONS[version:]:
+            migration(cursor)
         
+        cursor.execute('DELETE FROM schema_version')
+        cursor.execute('INSERT INTO schema_version (version) VALUES (?)', (SCHEMA_VERSION,))
         conn.commit()
-        print("Database initialized successfully!")
+        print(f"Database schema migrated from version {version} to {SCHEMA_VERSION}")
+        return True
 
 # User operations
 def create_user(rfid_uid, name, student_id, email, graduating_year, assigned_task='No task assigned'):
@@ -98,7 +244,9 @@ def create_user(rfid_uid, name, student_id, email, graduating_year, assigned_tas
             INSERT INTO users (rfid_uid, name, student_id, email, graduating_year, assigned_task, is_approved)
             VALUES (?, ?, ?, ?, ?, ?, 1)
         ''', (rfid_uid, name, student_id, email, graduating_year, assigned_task))
-        return cursor.lastrowid
+        user_id = cursor.lastrowid  # Before the generation bump's own INSERT overwrites it
+        _bump_cache_generation(cursor, 'users')
+        return user_id
 
 def get_user_by_rfid(rfid_uid):
     """Get user by RFID UID"""
@@ -148,13 +296,27 @@ def update_user(user_id, name=None, student_id=None, email=None, graduating_year
             params.append(user_id)
             query = f"UPDATE users SET {', '.join(updates)} WHERE id = ?"
             cursor.execute(query, params)
+            _bump_cache_generation(cursor, 'users')
+            if name or student_id or email:
+                # Cached daily reports embed these fields in their check-in rows
+                cursor.execute("DELETE FROM day_cache WHERE kind = 'daily_report'")
 
 def delete_user(user_id):
-    """Delete user and all their check-in records"""
+    """Delete user and all their check-in records (including archived seasons)"""
     with get_db() as conn:
+        # Commits are only atomic per file (attendance.db is in WAL mode), so archives go
+        # first and the user row last: an interrupted delete leaves the user visible and
+        # simply running it again finishes the job
+        for season in list_archive_seasons():
+            with attached_archive(conn, season) as cursor:
+                cursor.execute('DELETE FROM archive.checkins WHERE user_id = ?', (user_id,))
+        
         cursor = conn.cursor()
         cursor.execute('DELETE FROM checkins WHERE user_id = ?', (user_id,))
+        cursor.execute('DELETE FROM member_hours WHERE user_id = ?', (user_id,))
         cursor.execute('DELETE FROM users WHERE id = ?', (user_id,))
+        _bump_cache_generation(cursor, 'users')
+        _invalidate_days_from(cursor, '')
 
 # Check-in operations
 def check_in(user_id):
@@ -170,23 +332,29 @@ def check_in(user_id):
         if cursor.fetchone():
             return False, "Already checked in"
         
+        now = datetime.now()
         cursor.execute('''
             INSERT INTO checkins (user_id, check_in_time)
             VALUES (?, ?)
-        ''', (user_id, datetime.now()))
+        ''', (user_id, now))
+        _record_outbox(cursor, 'checkin', 'id = ?', (user_id,), now)
         return True, "Checked in successfully"
 
 def check_out(user_id, auto=False):
     """Check out a user"""
     with get_db() as conn:
         cursor = conn.cursor()
+        now = datetime.now()
+        _invalidate_days_of_open_sessions(cursor, 'user_id = ?', (user_id,))
         cursor.execute('''
             UPDATE checkins 
             SET check_out_time = ?, auto_checkout = ?
             WHERE user_id = ? AND check_out_time IS NULL
-        ''', (datetime.now(), auto, user_id))
+        ''', (now, auto, user_id))
         
         if cursor.rowcount > 0:
+            _credit_member_hours(cursor, 'user_id = ? AND check_out_time = ?', (user_id, now))
+            _record_outbox(cursor, 'auto_checkout' if auto else 'checkout', 'id = ?', (user_id,), now)
             return True, "Checked out successfully"
         return False, "Not checked in"
 
@@ -213,30 +381,68 @@ def get_user_status(user_id):
         ''', (user_id,))
         return cursor.fetchone() is not None
 
-def get_user_history(user_id, limit=50):
-    """Get check-in history for a user"""
+def get_open_checkin(user_id):
+    """Get the user's open check-in row, or None if not checked in"""
     with get_db() as conn:
         cursor = conn.cursor()
         cursor.execute('''
             SELECT * FROM checkins 
+            WHERE user_id = ? AND check_out_time IS NULL
+        ''', (user_id,))
+        return cursor.fetchone()
+
+def get_user_history(user_id, limit=50):
+    """Get check-in history for a user, reaching into archived seasons if needed"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT {CHECKIN_COLUMNS} FROM checkins 
             WHERE user_id = ?
             ORDER BY check_in_time DESC
             LIMIT ?
         ''', (user_id, limit))
-        return cursor.fetchall()
+        history = cursor.fetchall()
+        
+        # Newest season first, stopping as soon as we have enough rows
+        for season in sorted(list_archive_seasons(), reverse=True):
+            if len(history) >= limit:
+                break
+            with attached_archive(conn, season) as cursor:
+                cursor.execute(f'''
+                    SELECT {CHECKIN_COLUMNS} FROM archive.checkins
+                    WHERE user_id = ?
+                    ORDER BY check_in_time DESC
+                    LIMIT ?
+                ''', (user_id, limit - len(history)))
+                history.extend(cursor.fetchall())
+        # Sessions left open stay hot even when old, so merge by time
+        history.sort(key=lambda c: c['check_in_time'], reverse=True)
+        return history
 
 def get_all_checkins(start_date=None, end_date=None):
-    """Get all check-in records with optional date filtering"""
+    """Get all check-in records with optional date filtering (ranges include archived seasons)"""
     with get_db() as conn:
         cursor = conn.cursor()
         if start_date and end_date:
-            cursor.execute('''
+            query = '''
                 SELECT c.*, u.name, u.student_id, u.email
-                FROM checkins c
+                FROM {table} c
                 JOIN users u ON c.user_id = u.id
                 WHERE c.check_in_time BETWEEN ? AND ?
                 ORDER BY c.check_in_time DESC
-            ''', (start_date, end_date))
+            '''
+            cursor.execute(query.format(table='main.checkins'), (start_date, end_date))
+            checkins = cursor.fetchall()
+            
+            overlapping = seasons_between(start_date, end_date)
+            archived = [season for season in list_archive_seasons() if season in overlapping]
+            for season in archived:
+                with attached_archive(conn, season) as cursor:
+                    cursor.execute(query.format(table='archive.checkins'), (start_date, end_date))
+                    checkins.extend(cursor.fetchall())
+            if archived:
+                checkins.sort(key=lambda c: c['check_in_time'], reverse=True)
+            return checkins
         else:
             cursor.execute('''
                 SELECT c.*, u.name, u.student_id, u.email
@@ -247,6 +453,179 @@ def get_all_checkins(start_date=None, end_date=None):
             ''')
         return cursor.fetchall()
 
+def get_sessions_between(start, end):
+    """Sessions overlapping [start, end) as (user_id, check_in_time, check_out_time) rows, archives included"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        query = '''
+            SELECT user_id, check_in_time, check_out_time FROM {table}
+            WHERE check_out_time > ? AND check_in_time < ?
+        '''
+        cursor.execute(query.format(table='main.checkins'), (start, end))
+        sessions = cursor.fetchall()
+        cursor.execute('''
+            SELECT user_id, check_in_time, check_out_time FROM checkins
+            WHERE check_out_time IS NULL AND check_in_time < ?
+        ''', (end,))
+        sessions.extend(cursor.fetchall())
+        
+        overlapping = seasons_between(start, end)
+        for season in list_archive_seasons():
+            if season in overlapping:
+                with attached_archive(conn, season) as cursor:
+                    cursor.execute(query.format(table='archive.checkins'), (start, end))
+                    sessions.extend(cursor.fetchall())
+        return sessions
+
+# Day cache operations
+def get_cached_days(kind, days):
+    """Cached JSON payloads for the given days, as a dict of day -> payload"""
+    if not days:
+        return {}
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT day, payload FROM day_cache
+            WHERE kind = ? AND day IN ({','.join('?' * len(days))})
+        ''', (kind, *days))
+        return {row['day']: row['payload'] for row in cursor.fetchall()}
+
+def store_cached_days(kind, payloads):
+    """Cache JSON payloads for completed days (dict of day -> payload)"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.executemany('''
+            INSERT OR REPLACE INTO day_cache (kind, day, payload) VALUES (?, ?, ?)
+        ''', [(kind, day, payload) for day, payload in payloads.items()])
+
+def _invalidate_days_from(cursor, day):
+    """Drop cached results for day and every later day (call inside the editing transaction)"""
+    cursor.execute('DELETE FROM day_cache WHERE day >= ?', (day,))
+
+def _invalidate_days_of_open_sessions(cursor, session_filter, params):
+    """Before closing open sessions, drop cached days they span (they were cached as still open)"""
+    cursor.execute(f'''
+        SELECT MIN(check_in_time) AS earliest FROM checkins
+        WHERE check_out_time IS NULL AND ({session_filter})
+    ''', params)
+    earliest = cursor.fetchone()['earliest']
+    if earliest and earliest[:10] < datetime.now().strftime('%Y-%m-%d'):
+        _invalidate_days_from(cursor, earliest[:10])
+
+# Season archive operations
+def season_for(timestamp):
+    """Season label ('2025-2026') for a datetime or stored timestamp string"""
+    if isinstance(timestamp, str):
+        year, month = int(timestamp[:4]), int(timestamp[5:7])
+    else:
+        year, month = timestamp.year, timestamp.month
+    start_year = year if month >= config.SEASON_START_MONTH else year - 1
+    return f"{start_year}-{start_year + 1}"
+
+def season_bounds(season):
+    """Return (start, end) timestamp strings; the season covers start <= t < end"""
+    start_year = int(season[:4])
+    month = config.SEASON_START_MONTH
+    return (f"{start_year}-{month:02d}-01 00:00:00", f"{start_year + 1}-{month:02d}-01 00:00:00")
+
+def seasons_between(start_date, end_date):
+    """All season labels overlapping a timestamp range"""
+    first = int(season_for(start_date)[:4])
+    last = int(season_for(end_date)[:4])
+    return [f"{year}-{year + 1}" for year in range(first, last + 1)]
+
+def archive_path(season):
+    """Path of the archive database for a season"""
+    return os.path.join(config.ARCHIVE_DIR, f"attendance-{season}.db")
+
+def list_archive_seasons():
+    """Seasons that have an archive file on disk"""
+    pattern = os.path.join(config.ARCHIVE_DIR, 'attendance-*.db')
+    return sorted(os.path.basename(path)[len('attendance-'):-len('.db')]
+                  for path in glob.glob(pattern))
+
+def _attach_archive(conn, season, schema):
+    """ATTACH a season archive as schema, creating its table if the file is new"""
+    conn.execute(f'ATTACH DATABASE ? AS {schema}', (archive_path(season),))
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {schema}.checkins (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            check_in_time TIMESTAMP NOT NULL,
+            check_out_time TIMESTAMP,
+            auto_checkout BOOLEAN DEFAULT 0,
+            node_id TEXT
+        )
+    ''')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS {schema}.idx_archive_user ON checkins(user_id, check_in_time)')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS {schema}.idx_archive_time ON checkins(check_in_time)')
+
+@contextmanager
+def attached_archive(conn, season):
+    """ATTACH a season archive as schema 'archive' for the duration of the block"""
+    if conn.in_transaction:
+        raise RuntimeError("Attach archives before writing; ATTACH would split the open transaction")
+    _attach_archive(conn, season, 'archive')
+    try:
+        yield conn.cursor()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.execute('DETACH DATABASE archive')
+
+def archive_closed_sessions(cutoff):
+    """Move closed sessions that started before cutoff into their season's archive file
+    
+    With attendance.db in WAL mode a commit spanning attached files is only
+    atomic per file, so each season moves in two idempotent steps: copy the
+    sessions into the archive and commit, then delete the hot rows whose id
+    is now archived. Re-running after an interruption repairs a half-done move.
+    Returns a dict of season -> sessions moved.
+    """
+    os.makedirs(config.ARCHIVE_DIR, exist_ok=True)
+    moved = {}
+    with get_db() as conn:
+        cursor = conn.cursor()
+        # Only seasons that have sessions to move, so no empty archive files are created
+        cursor.execute('''
+            SELECT DISTINCT season_for(check_in_time) AS season FROM checkins
+            WHERE check_out_time IS NOT NULL AND check_in_time < ?
+        ''', (cutoff,))
+        seasons = sorted(row['season'] for row in cursor.fetchall())
+        
+        for season in seasons:
+            start, end = season_bounds(season)
+            with attached_archive(conn, season) as cursor:
+                predicate = '''
+                    check_out_time IS NOT NULL
+                    AND check_in_time >= ? AND check_in_time < ? AND check_in_time < ?
+                '''
+                params = (start, end, cutoff)
+                cursor.execute(f'''
+                    INSERT OR REPLACE INTO archive.checkins ({CHECKIN_COLUMNS})
+                    SELECT {CHECKIN_COLUMNS} FROM main.checkins WHERE {predicate}
+                ''', params)
+            # Separate transaction: ids are AUTOINCREMENT, so an archived id is never a newer session
+            with attached_archive(conn, season) as cursor:
+                cursor.execute('DELETE FROM main.checkins WHERE id IN (SELECT id FROM archive.checkins)')
+                if cursor.rowcount:
+                    moved[season] = cursor.rowcount
+    return moved
+
+def drop_archived_duplicates():
+    """Remove hot sessions that also exist in an archive (e.g. after a restore); returns rows removed"""
+    removed = 0
+    with get_db() as conn:
+        for season in list_archive_seasons():
+            with attached_archive(conn, season) as cursor:
+                cursor.execute('DELETE FROM main.checkins WHERE id IN (SELECT id FROM archive.checkins)')
+                removed += cursor.rowcount
+        cursor = conn.cursor()
+        _invalidate_days_from(cursor, '')
+    return removed
+
 # Admin operations
 def create_admin(username, password_hash, full_name):
     """Create admin account"""
@@ -256,7 +635,9 @@ def create_admin(username, password_hash, full_name):
             INSERT INTO admins (username, password_hash, full_name)
             VALUES (?, ?, ?)
         ''', (username, password_hash, full_name))
-        return cursor.lastrowid
+        admin_id = cursor.lastrowid  # Before the generation bump's own INSERT overwrites it
+        _bump_cache_generation(cursor, 'admins')
+        return admin_id
 
 def get_admin_by_username(username):
     """Get admin by username"""
@@ -265,6 +646,13 @@ def get_admin_by_username(username):
         cursor.execute('SELECT * FROM admins WHERE username = ?', (username,))
         return cursor.fetchone()
 
+def get_admins_by_username():
+    """All admin accounts keyed by username"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM admins')
+        return {admin['username']: admin for admin in cursor.fetchall()}
+
 # Settings operations
 def get_setting(key):
     """Get a setting value"""
@@ -282,18 +670,366 @@ def update_setting(key, value):
             INSERT OR REPLACE INTO settings (key, value)
             VALUES (?, ?)
         ''', (key, value))
+        _bump_cache_generation(cursor, 'settings')
+
+# Cache invalidation operations
+def _bump_cache_generation(cursor, name):
+    """Mark a cache as stale for every worker (call inside the writing transaction)"""
+    cursor.execute('''
+        INSERT INTO cache_generations (name, generation) VALUES (?, 1)
+        ON CONFLICT(name) DO UPDATE SET generation = generation + 1
+    ''', (name,))
+
+def get_cache_generation(name):
+    """Get the current generation of a named cache"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT generation FROM cache_generations WHERE name = ?', (name,))
+        result = cursor.fetchone()
+        return result['generation'] if result else 0
+
+# Leader election operations
+def acquire_lease(name, holder, ttl):
+    """Take or renew a named lease; returns True if holder owns it for the next ttl seconds"""
+    now = time.time()
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at
+            WHERE leases.holder = excluded.holder OR leases.expires_at < ?
+        ''', (name, holder, now + ttl, now))
+        return cursor.rowcount > 0
+
+def release_lease(name, holder):
+    """Give up a lease so another worker can take over immediately"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM leases WHERE name = ? AND holder = ?', (name, holder))
 
 # Auto-checkout operations
 def auto_checkout_all():
     """Auto checkout all currently checked-in users"""
     with get_db() as conn:
         cursor = conn.cursor()
+        now = datetime.now()
+        _invalidate_days_of_open_sessions(cursor, '1', ())
+        _record_outbox(cursor, 'auto_checkout',
+                       'id IN (SELECT user_id FROM checkins WHERE check_out_time IS NULL)', (), now)
         cursor.execute('''
             UPDATE checkins 
             SET check_out_time = ?, auto_checkout = 1
             WHERE check_out_time IS NULL
-        ''', (datetime.now(),))
-        return cursor.rowcount
+        ''', (now,))
+        count = cursor.rowcount
+        _credit_member_hours(cursor, 'check_out_time = ? AND auto_checkout = 1', (now,))
+        return count
+
+# Member hours operations
+def _session_totals_sql(table, session_filter, season_expr):
+    """Query summing closed sessions into (user_id, season, minutes, sessions, last_seen) rows"""
+    return f'''
+        SELECT user_id, {season_expr} AS season,
+               SUM((julianday(check_out_time) - julianday(check_in_time)) * 1440) AS minutes,
+               COUNT(*) AS sessions,
+               MAX(check_out_time) AS last_seen
+        FROM {table}
+        WHERE check_out_time IS NOT NULL AND ({session_filter})
+        GROUP BY user_id, season
+    '''
+
+def _apply_member_hours(cursor, totals, sign=1):
+    """Add (or with sign=-1, remove) session totals to both the season and lifetime rows"""
+    for row in totals:
+        for season in (row['season'], 'lifetime'):
+            cursor.execute('''
+                INSERT INTO member_hours (user_id, season, total_minutes, session_count, last_seen)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(user_id, season) DO UPDATE SET
+                    total_minutes = total_minutes + excluded.total_minutes,
+                    session_count = session_count + excluded.session_count,
+                    last_seen = MAX(COALESCE(last_seen, ''), COALESCE(excluded.last_seen, ''))
+            ''', (row['user_id'], season, sign * row['minutes'], sign * row['sessions'], row['last_seen']))
+
+def _credit_member_hours(cursor, session_filter, params, sign=1):
+    """Add closed checkins matching session_filter to the ledger (call inside the closing transaction)
+
+    With sign=-1 (before a session is shortened or reopened) last_seen is
+    recomputed from the user's other closed sessions, since the MAX() in
+    the upsert can only move it forward.
+    """
+    cursor.execute(_session_totals_sql('checkins', session_filter, 'season_for(check_in_time)'), params)
+    totals = cursor.fetchall()
+    _apply_member_hours(cursor, totals, sign)
+    if sign < 0:
+        for row in totals:
+            cursor.execute(f'''
+                UPDATE member_hours SET last_seen = (
+                    SELECT MAX(check_out_time) FROM checkins
+                    WHERE user_id = member_hours.user_id AND check_out_time IS NOT NULL
+                      AND (member_hours.season = 'lifetime' OR season_for(check_in_time) = member_hours.season)
+                      AND NOT ({session_filter})
+                )
+                WHERE user_id = ? AND season IN (?, 'lifetime')
+            ''', (*params, row['user_id'], row['season']))
+
+def get_member_hours(season, graduating_year=None):
+    """Totals for every member in a season ('lifetime' for all time), members without hours included"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        query = '''
+            SELECT u.id AS user_id, u.name, u.student_id, u.graduating_year,
+                   COALESCE(h.total_minutes, 0) AS total_minutes,
+                   COALESCE(h.session_count, 0) AS session_count,
+                   h.last_seen
+            FROM users u
+            LEFT JOIN member_hours h ON h.user_id = u.id AND h.season = ?
+        '''
+        params = [season]
+        if graduating_year:
+            query += ' WHERE u.graduating_year = ?'
+            params.append(graduating_year)
+        cursor.execute(query + ' ORDER BY u.name', params)
+        return cursor.fetchall()
+
+def get_hours_leaderboard(season, limit, graduating_year=None):
+    """Top members by minutes for a season, overall and within each graduating year"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        year_filter = 'AND u.graduating_year = ?' if graduating_year else ''
+        params = [season, graduating_year] if graduating_year else [season]
+        cursor.execute(f'''
+            SELECT * FROM (
+                SELECT u.id AS user_id, u.name, u.graduating_year,
+                       h.total_minutes, h.session_count,
+                       ROW_NUMBER() OVER (ORDER BY h.total_minutes DESC) AS overall_rank,
+                       ROW_NUMBER() OVER (PARTITION BY u.graduating_year
+                                          ORDER BY h.total_minutes DESC) AS year_rank
+                FROM member_hours h
+                JOIN users u ON u.id = h.user_id
+                WHERE h.season = ? {year_filter}
+            )
+            WHERE overall_rank <= ? OR year_rank <= ?
+            ORDER BY total_minutes DESC
+        ''', (*params, limit, limit))
+        return cursor.fetchall()
+
+# Replication operations (scanner node side)
+def _record_outbox(cursor, event_type, user_filter, params, event_time):
+    """Queue check-in/out events for central when running as a replication node"""
+    if config.REPLICATION_ROLE != 'node':
+        return
+    cursor.execute(f'''
+        INSERT INTO outbox (event_type, student_id, event_time)
+        SELECT ?, student_id, ? FROM users WHERE {user_filter}
+    ''', (event_type, event_time, *params))
+
+def get_pending_outbox(limit):
+    """Get the oldest unsynced outbox events"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT * FROM outbox ORDER BY seq LIMIT ?
+        ''', (limit,))
+        return cursor.fetchall()
+
+def ack_outbox(last_seq):
+    """Drop outbox events central has acknowledged"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM outbox WHERE seq <= ?', (last_seq,))
+
+def replace_users(users):
+    """Make the local users table match the list distributed by central (keyed by student_id)"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        student_ids = [u['student_id'] for u in users]
+        
+        # Users removed centrally can no longer tap in here
+        cursor.execute(f'''
+            SELECT id FROM users WHERE student_id NOT IN ({','.join('?' * len(student_ids))})
+        ''', student_ids)
+        for row in cursor.fetchall():
+            cursor.execute('DELETE FROM checkins WHERE user_id = ?', (row['id'],))
+            cursor.execute('DELETE FROM member_hours WHERE user_id = ?', (row['id'],))
+            cursor.execute('DELETE FROM users WHERE id = ?', (row['id'],))
+            _invalidate_days_from(cursor, '')
+        
+        # Free reassigned cards before upserting so the UNIQUE(rfid_uid) constraint holds
+        for user in users:
+            cursor.execute('''
+                UPDATE users SET rfid_uid = 'reassigned:' || student_id
+                WHERE rfid_uid = ? AND student_id != ?
+            ''', (user['rfid_uid'], user['student_id']))
+        
+        for user in users:
+            cursor.execute('''
+                INSERT INTO users (rfid_uid, name, student_id, email, graduating_year, assigned_task, is_approved)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(student_id) DO UPDATE SET
+                    rfid_uid = excluded.rfid_uid,
+                    name = excluded.name,
+                    email = excluded.email,
+                    graduating_year = excluded.graduating_year,
+                    assigned_task = excluded.assigned_task,
+                    is_approved = excluded.is_approved
+            ''', (user['rfid_uid'], user['name'], user['student_id'], user['email'],
+                  user['graduating_year'], user['assigned_task'], user['is_approved']))
+        _bump_cache_generation(cursor, 'users')
+
+# Replication operations (central side)
+REPLICATED_EVENT_TYPES = ('checkin', 'checkout', 'auto_checkout')
+
+def _replicated_event_error(event):
+    """Why a node event cannot be applied, or None if it is well formed"""
+    if not isinstance(event, dict):
+        return 'not an object'
+    if event.get('event_type') not in REPLICATED_EVENT_TYPES:
+        return 'unknown event_type'
+    if not isinstance(event.get('student_id'), str) or not event['student_id']:
+        return 'missing student_id'
+    if _canonical_event_time(event.get('event_time')) is None:
+        return 'bad event_time'
+    return None
+
+def _canonical_event_time(value):
+    """A node timestamp in the stored 'YYYY-MM-DD HH:MM:SS.ffffff' form, or None if unusable
+
+    Stored timestamps are compared as strings, so '2025-09-01T12:00:00' or a
+    value without microseconds must never reach the checkins table as sent.
+    """
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is not None:
+        return None  # Local wall-clock times only, like every other stored timestamp
+    return parsed.strftime('%Y-%m-%d %H:%M:%S.%f')
+
+def _valid_seq(event):
+    """The event's seq if it is an integer, else None"""
+    seq = event.get('seq') if isinstance(event, dict) else None
+    return seq if isinstance(seq, int) and not isinstance(seq, bool) else None
+
+def apply_replicated_events(node_id, events):
+    """Apply a batch of node events in one transaction
+    
+    Events already applied (same node_id and seq) are skipped, so nodes can
+    safely resend a batch. A user can only be in one room at a time: a
+    check-in closes any earlier open session at the moment of the new tap,
+    and a check-out never extends a session past an earlier end time.
+    Malformed events are rejected one at a time (and recorded, so the node
+    can move past them) without affecting the rest of the batch.
+    Returns a list of (seq, result) pairs.
+    """
+    results = []
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        valid_times = [_canonical_event_time(event['event_time'])
+                       for event in events if _replicated_event_error(event) is None]
+        if valid_times:
+            # Late events can rewrite sessions that began before the oldest event
+            oldest = min(valid_times)
+            cursor.execute('''
+                SELECT MIN(check_in_time) AS earliest FROM checkins
+                WHERE check_out_time IS NULL OR check_out_time > ?
+            ''', (oldest,))
+            earliest = cursor.fetchone()['earliest'] or oldest
+            _invalidate_days_from(cursor, min(earliest, oldest)[:10])
+        
+        for event in events:
+            seq = _valid_seq(event)
+            if seq is None:
+                results.append((None, 'rejected: bad seq'))
+                continue
+            
+            cursor.execute('''
+                INSERT OR IGNORE INTO replicated_events (node_id, seq) VALUES (?, ?)
+            ''', (node_id, seq))
+            if cursor.rowcount == 0:
+                results.append((seq, 'duplicate'))
+                continue
+            
+            error = _replicated_event_error(event)
+            if error:
+                print(f"Replication: rejected event {node_id}#{seq}: {error}")
+                results.append((seq, f"rejected: {error}"))
+                continue
+            
+            cursor.execute('SELECT id FROM users WHERE student_id = ?', (event['student_id'],))
+            user = cursor.fetchone()
+            if not user:
+                results.append((seq, 'unknown_user'))
+                continue
+            event_time = _canonical_event_time(event['event_time'])
+            
+            # One event's failure rolls back only that event (it stays recorded as seen)
+            cursor.execute('SAVEPOINT replicated_event')
+            try:
+                if event['event_type'] == 'checkin':
+                    result = _apply_replicated_checkin(cursor, node_id, user['id'], event_time)
+                else:
+                    result = _apply_replicated_checkout(cursor, node_id, user['id'], event_time,
+                                                        event['event_type'] == 'auto_checkout')
+            except sqlite3.Error as e:
+                cursor.execute('ROLLBACK TO replicated_event')
+                print(f"Replication: rejected event {node_id}#{seq}: {e}")
+                result = f"rejected: {e}"
+            cursor.execute('RELEASE replicated_event')
+            results.append((seq, result))
+    return results
+
+def _apply_replicated_checkin(cursor, node_id, user_id, event_time):
+    """Insert a check-in from a node, resolving overlap with the user's other sessions"""
+    # The session that was open when this tap happened ends at the tap
+    cursor.execute('''
+        SELECT id FROM checkins
+        WHERE user_id = ? AND check_in_time <= ?
+          AND (check_out_time IS NULL OR check_out_time > ?)
+    ''', (user_id, event_time, event_time))
+    ids = [row['id'] for row in cursor.fetchall()]
+    if ids:
+        id_filter = f"id IN ({','.join('?' * len(ids))})"
+        _credit_member_hours(cursor, id_filter, ids, sign=-1)
+        cursor.execute(f'''
+            UPDATE checkins SET check_out_time = ?, auto_checkout = 0 WHERE {id_filter}
+        ''', (event_time, *ids))
+        _credit_member_hours(cursor, id_filter, ids)
+    
+    # A late-arriving tap that predates a newer session ends where that session starts
+    cursor.execute('''
+        SELECT MIN(check_in_time) AS next_start FROM checkins
+        WHERE user_id = ? AND check_in_time > ?
+    ''', (user_id, event_time))
+    next_start = cursor.fetchone()['next_start']
+    
+    cursor.execute('''
+        INSERT INTO checkins (user_id, check_in_time, check_out_time, node_id)
+        VALUES (?, ?, ?, ?)
+    ''', (user_id, event_time, next_start, node_id))
+    _credit_member_hours(cursor, 'id = ?', (cursor.lastrowid,))
+    return 'applied' if next_start is None else 'applied_closed'
+
+def _apply_replicated_checkout(cursor, node_id, user_id, event_time, auto):
+    """Close the node's session that this check-out belongs to"""
+    cursor.execute('''
+        SELECT id FROM checkins
+        WHERE user_id = ? AND node_id = ? AND check_in_time <= ?
+          AND (check_out_time IS NULL OR check_out_time > ?)
+        ORDER BY check_in_time DESC LIMIT 1
+    ''', (user_id, node_id, event_time, event_time))
+    session = cursor.fetchone()
+    if not session:
+        # Already ended earlier (e.g. the user tapped in at another room first)
+        return 'superseded'
+    # A session truncated earlier by conflict resolution is re-credited with its real end
+    _credit_member_hours(cursor, 'id = ?', (session['id'],), sign=-1)
+    cursor.execute('''
+        UPDATE checkins SET check_out_time = ?, auto_checkout = ? WHERE id = ?
+    ''', (event_time, auto, session['id']))
+    _credit_member_hours(cursor, 'id = ?', (session['id'],))
+    return 'applied'
 
 if __name__ == '__main__':
     init_db()
@@ -0,0 +1,220 @@
+"""
+On-demand profiling for production diagnosis
+An admin requests a capture for a time window; every process (web workers
+and the scanner) notices the request through the settings table and either
+cProfiles the window into a .pstats file, or samples all thread stacks into
+a flamegraph-ready .collapsed file. When no capture is active the hooks
+cost a single global lookup.
+
+Only one cProfile profiler is ever active per process. On Python 3.12+
+(where cProfile sees every thread) it runs for the whole window; on older
+versions it follows one unit of work (request, scheduler tick, scan) at a
+time, and units that start while another is being profiled are skipped.
+"""
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import config
+import models
+
+MODES = ('cprofile', 'sample')
+
+# cProfile is process-wide from 3.12 (sys.monitoring); before that it only sees the enabling thread
+WHOLE_PROCESS_PROFILE = sys.version_info >= (3, 12)
+
+_active = None  # The running Capture, or None - the only thing hooks check when idle
+_lock = threading.Lock()
+_unit_lock = threading.Lock()  # Held while a unit of work is being profiled
+_last_poll = 0.0
+_seen_request = None
+
+class Capture:
+    def __init__(self, capture_id, mode, seconds, label):
+        self.id = capture_id
+        self.mode = mode
+        self.label = label
+        self.until = time.time() + seconds
+        self.stats = None
+        self.samples = Counter()
+        self.stats_lock = threading.Lock()
+
+# ============================================================================
+# Requesting captures (any process)
+# ============================================================================
+
+def request_capture(mode, seconds):
+    """Ask every process to capture for the next `seconds`; returns the request"""
+    seconds = min(max(1, int(seconds)), config.PROFILE_MAX_SECONDS)
+    capture_request = {
+        'id': time.strftime('%Y%m%d-%H%M%S'),
+        'mode': mode,
+        'until': time.time() + seconds
+    }
+    models.update_setting('profile_request', json.dumps(capture_request))
+    return capture_request
+
+def poll(label):
+    """Start a capture if one was requested (cheap - hits the DB once per PROFILE_POLL_SECONDS)"""
+    global _last_poll, _seen_request
+    now = time.time()
+    if now - _last_poll < config.PROFILE_POLL_SECONDS:
+        return
+    _last_poll = now
+
+    try:
+        raw = models.get_setting('profile_request')
+        if not raw or raw == _seen_request:
+            return
+        _seen_request = raw
+        capture_request = json.loads(raw)
+        if capture_request['until'] > now:
+            start(capture_request['id'], capture_request['mode'], capture_request['until'] - now, label)
+    except Exception as e:
+        # Never let diagnostics take down the scan loop or a scheduler
+        print(f"Profiler: could not check for capture requests: {e}")
+
+def active():
+    """The running capture in this process, or None"""
+    return _active
+
+# ============================================================================
+# Running a capture (this process)
+# ============================================================================
+
+def start(capture_id, mode, seconds, label):
+    """Start a capture in this process; returns False if one is already running"""
+    global _active
+    with _lock:
+        if _active is not None:
+            return False
+        capture = Capture(capture_id, mode, seconds, label)
+        _active = capture
+    print(f"Profiler: {mode} capture {capture_id} started for {seconds:.0f}s ({label})")
+    threading.Thread(target=_run_capture, args=(capture,), daemon=True).start()
+    return True
+
+def _run_capture(capture):
+    """Sample (or just wait) until the window ends, then write the capture file"""
+    global _active
+    if capture.mode == 'sample':
+        while time.time() < capture.until:
+            _take_sample(capture)
+            time.sleep(config.PROFILE_SAMPLE_INTERVAL)
+    elif WHOLE_PROCESS_PROFILE:
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e:
+            # Another profiler (e.g. a debugger) already owns sys.monitoring
+            print(f"Profiler: cannot profile this process: {e}")
+            profile = None
+        time.sleep(max(0, capture.until - time.time()))
+        if profile:
+            profile.disable()
+            _merge(capture, profile)
+    else:
+        time.sleep(max(0, capture.until - time.time()))
+
+    with _lock:
+        _active = None
+    # Let units of work that began before the window closed finish adding their stats
+    time.sleep(0.5)
+    path = _write(capture)
+    print(f"Profiler: capture {capture.id} written to {path}")
+
+def _take_sample(capture):
+    """Record the current stack of every other thread"""
+    me = threading.get_ident()
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    for ident, frame in sys._current_frames().items():
+        if ident == me:
+            continue
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        stack.append(names.get(ident, str(ident)))
+        capture.samples[';'.join(reversed(stack))] += 1
+
+def _write(capture):
+    """Write the capture to PROFILE_DIR; returns the file path"""
+    os.makedirs(config.PROFILE_DIR, exist_ok=True)
+    if capture.mode == 'sample':
+        path = os.path.join(config.PROFILE_DIR, f"{capture.id}-{capture.label}.collapsed")
+        with open(path, 'w') as f:
+            for stack, count in capture.samples.most_common():
+                f.write(f"{stack} {count}\n")
+    else:
+        path = os.path.join(config.PROFILE_DIR, f"{capture.id}-{capture.label}.pstats")
+        with capture.stats_lock:
+            if capture.stats is None:
+                # Nothing ran in this process during the window - still leave a loadable file
+                profile = cProfile.Profile()
+                profile.enable()
+                profile.disable()
+                capture.stats = pstats.Stats(profile)
+            capture.stats.dump_stats(path)
+    return path
+
+def list_captures():
+    """Capture files, newest first"""
+    if not os.path.isdir(config.PROFILE_DIR):
+        return []
+    return sorted((name for name in os.listdir(config.PROFILE_DIR)
+                   if name.endswith(('.pstats', '.collapsed'))), reverse=True)
+
+# ============================================================================
+# Hooks around units of work
+# ============================================================================
+
+def _merge(capture, profile):
+    """Add a finished profiler's stats to the capture"""
+    with capture.stats_lock:
+        if capture.stats is None:
+            capture.stats = pstats.Stats(profile)
+        else:
+            capture.stats.add(profile)
+
+def begin():
+    """Start cProfiling the current unit of work if a per-unit cprofile capture is active"""
+    capture = _active
+    if capture is None or capture.mode != 'cprofile' or WHOLE_PROCESS_PROFILE:
+        return None
+    # One profiler at a time: green threads share an OS thread's profile hook
+    if not _unit_lock.acquire(blocking=False):
+        return None
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        _unit_lock.release()
+        return None
+    return capture, profile
+
+def end(token):
+    """Stop profiling a unit of work started with begin() and merge its stats"""
+    if token is None:
+        return
+    capture, profile = token
+    try:
+        profile.disable()
+    finally:
+        _unit_lock.release()
+    _merge(capture, profile)
+
+@contextmanager
+def profiled():
+    """Profile the enclosed block as one unit of work (no-op when idle)"""
+    token = begin()
+    try:
+        yield
+    finally:
+        end(token)
@@ -0,0 +1,103 @@
+"""
+Replication client for scanner nodes
+Pushes the local outbox of check-in/out events to the central app.py in
+batches and pulls the central user table back down
+
+Run one per node alongside rfid_scanner.py:
+    ATTENDANCE_REPLICATION_ROLE=node ATTENDANCE_NODE_ID=room-101 \
+    ATTENDANCE_CENTRAL_URL=http://central:5000 python3 replication.py
+
+Several nodes can be tested on one machine by giving each process its own
+ATTENDANCE_DB and ATTENDANCE_NODE_ID, with a central app.py started with
+ATTENDANCE_REPLICATION_ROLE=central.
+"""
+import argparse
+import json
+import time
+import urllib.request
+
+import config
+import models
+
+def _request(method, path, payload=None):
+    """Call the central server and return the decoded JSON response"""
+    body = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(
+        f"{config.CENTRAL_URL}{path}",
+        data=body,
+        method=method,
+        headers={
+            'Content-Type': 'application/json',
+            'X-Replication-Token': config.REPLICATION_TOKEN
+        }
+    )
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        return json.loads(resp.read())
+
+def push_events():
+    """Send outbox events to central until the outbox is empty; returns events sent"""
+    sent = 0
+    while True:
+        events = models.get_pending_outbox(config.REPLICATION_BATCH_SIZE)
+        if not events:
+            return sent
+
+        response = _request('POST', '/api/replication/events', {
+            'node_id': config.NODE_ID,
+            'events': [{
+                'seq': event['seq'],
+                'event_type': event['event_type'],
+                'student_id': event['student_id'],
+                'event_time': event['event_time']
+            } for event in events]
+        })
+        models.ack_outbox(response['last_seq'])
+        sent += len(events)
+
+def pull_users():
+    """Refresh the local user table from central if it changed; returns True if updated"""
+    since = models.get_setting('replication_users_generation')
+    path = '/api/replication/users'
+    if since is not None:
+        path += f"?since={since}"
+
+    response = _request('GET', path)
+    if not response['changed']:
+        return False
+
+    models.replace_users(response['users'])
+    models.update_setting('replication_users_generation', str(response['generation']))
+    return True
+
+def sync_once():
+    """Run one push/pull cycle"""
+    sent = push_events()
+    updated = pull_users()
+    if sent or updated:
+        print(f"Sync: {sent} events pushed" + (", user table updated" if updated else ""))
+
+def run():
+    """Sync forever, riding out network outages (events wait in the outbox)"""
+    print(f"Replication node '{config.NODE_ID}' syncing to {config.CENTRAL_URL}")
+    while True:
+        try:
+            sync_once()
+        except Exception as e:
+            print(f"Sync failed, will retry: {e}")
+        time.sleep(config.REPLICATION_INTERVAL)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sync this scanner node with central')
+    parser.add_argument('--once', action='store_true', help='Run a single sync and exit')
+    args = parser.parse_args()
+
+    if config.REPLICATION_ROLE != 'node':
+        print("WARNING: ATTENDANCE_REPLICATION_ROLE is not 'node'; taps here are not queued for sync")
+    if config.REPLICATION_TOKEN in ('', config.DEFAULT_REPLICATION_TOKEN):
+        raise SystemExit("Set ATTENDANCE_REPLICATION_TOKEN to the secret configured on central")
+
+    models.init_db()
+    if args.once:
+        sync_once()
+    else:
+        run()
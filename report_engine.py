@@ -0,0 +1,210 @@
+"""
+Report engine for RFID Attendance System
+Builds attendance reports from per-day results, cached in day_cache once
+each day is complete. Long ranges run as background jobs with a bounded
+number running (and queued) at once, and callers poll the job status.
+"""
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import config
+import day_cache
+import models
+import workers
+
+def _minutes(check_in_time, check_out_time):
+    """Duration in minutes between two stored timestamps"""
+    return (datetime.fromisoformat(check_out_time) - datetime.fromisoformat(check_in_time)).total_seconds() / 60
+
+# ============================================================================
+# Per-day builders
+# ============================================================================
+
+def _compute_daily_reports(first_day, last_day):
+    """Full daily reports (with check-in rows) for a run of days from one query"""
+    checkins = models.get_all_checkins(f"{first_day:%Y-%m-%d} 00:00:00", f"{last_day:%Y-%m-%d} 23:59:59")
+    by_day = {day.strftime('%Y-%m-%d'): [] for day in day_cache.days_between(first_day, last_day)}
+    for checkin in checkins:
+        by_day.setdefault(checkin['check_in_time'][:10], []).append(checkin)
+
+    reports = {}
+    for date_str, day_checkins in by_day.items():
+        completed = [_minutes(c['check_in_time'], c['check_out_time'])
+                     for c in day_checkins if c['check_out_time']]
+        reports[date_str] = {
+            'date': date_str,
+            'total_visits': len(day_checkins),
+            'unique_visitors': len(set(c['user_id'] for c in day_checkins)),
+            'average_duration_minutes': round(sum(completed) / len(completed), 2) if completed else 0,
+            'checkins': [dict(c) for c in day_checkins]
+        }
+    return reports
+
+def _compute_summaries(first_day, last_day):
+    """Compact per-day statistics (no rows) used to aggregate long ranges"""
+    summaries = {}
+    for date_str, report in _compute_daily_reports(first_day, last_day).items():
+        completed = [_minutes(c['check_in_time'], c['check_out_time'])
+                     for c in report['checkins'] if c['check_out_time']]
+        summaries[date_str] = {
+            'date': date_str,
+            'total_visits': report['total_visits'],
+            'unique_visitors': report['unique_visitors'],
+            'user_ids': sorted(set(c['user_id'] for c in report['checkins'])),
+            'completed_visits': len(completed),
+            'total_duration_minutes': round(sum(completed), 2)
+        }
+    return summaries
+
+# ============================================================================
+# Reports (synchronous - short ranges)
+# ============================================================================
+
+def build_daily_report(date_str):
+    """Attendance report for one day"""
+    day = datetime.strptime(date_str, '%Y-%m-%d').date()
+    return day_cache.cached_per_day('daily_report', [day], _compute_daily_reports)[0]
+
+def build_weekly_report(end_date):
+    """Per-day statistics for the 7 days up to end_date (days with visits only)"""
+    days = day_cache.days_between((end_date - timedelta(days=7)).date(), end_date.date())
+    return [{
+        'date': summary['date'],
+        'total_visits': summary['total_visits'],
+        'unique_visitors': summary['unique_visitors']
+    } for summary in day_cache.cached_per_day('summary', days, _compute_summaries) if summary['total_visits']]
+
+def build_user_history(user_id):
+    """Recent check-in history for a user"""
+    history = models.get_user_history(user_id, limit=100)
+
+    result = []
+    for record in history:
+        duration = None
+        if record['check_out_time']:
+            duration = int(_minutes(record['check_in_time'], record['check_out_time']))
+
+        result.append({
+            'check_in_time': record['check_in_time'],
+            'check_out_time': record['check_out_time'],
+            'duration_minutes': duration,
+            'auto_checkout': record['auto_checkout']
+        })
+
+    return result
+
+def build_range_report(first_day, last_day, progress=None):
+    """Statistics for an arbitrary range, computed a chunk of days at a time"""
+    days = day_cache.days_between(first_day, last_day)
+    summaries = []
+    for index in range(0, len(days), config.REPORT_CHUNK_DAYS):
+        chunk = days[index:index + config.REPORT_CHUNK_DAYS]
+        # Each chunk is one query on a real DB thread, so the event loop stays responsive
+        summaries.extend(workers.run_blocking(day_cache.cached_per_day, 'summary', chunk, _compute_summaries))
+        if progress:
+            progress(len(summaries), len(days))
+
+    visitors = set()
+    completed = 0
+    duration = 0.0
+    for summary in summaries:
+        visitors.update(summary['user_ids'])
+        completed += summary['completed_visits']
+        duration += summary['total_duration_minutes']
+
+    return {
+        'start': first_day.strftime('%Y-%m-%d'),
+        'end': last_day.strftime('%Y-%m-%d'),
+        'total_visits': sum(summary['total_visits'] for summary in summaries),
+        'unique_visitors': len(visitors),
+        'average_duration_minutes': round(duration / completed, 2) if completed else 0,
+        'total_hours': round(duration / 60, 2),
+        'days': [{
+            'date': summary['date'],
+            'total_visits': summary['total_visits'],
+            'unique_visitors': summary['unique_visitors']
+        } for summary in summaries]
+    }
+
+# ============================================================================
+# Background jobs (long ranges)
+# ============================================================================
+
+class JobQueueFull(Exception):
+    """REPORT_JOB_QUEUE jobs are already queued or running"""
+
+_jobs = OrderedDict()
+_jobs_lock = threading.Lock()
+_job_slots = None
+
+def _get_job_slots():
+    """Semaphore bounding how many report jobs compute at once"""
+    global _job_slots
+    if _job_slots is None:
+        with _jobs_lock:
+            if _job_slots is None:
+                _job_slots = threading.BoundedSemaphore(config.REPORT_JOB_WORKERS)
+    return _job_slots
+
+def _forget_old_jobs():
+    """Keep at most REPORT_JOB_HISTORY finished jobs (call with _jobs_lock held)"""
+    finished = [job_id for job_id, job in _jobs.items() if job['status'] in ('done', 'failed')]
+    for job_id in finished[:max(0, len(finished) - config.REPORT_JOB_HISTORY)]:
+        del _jobs[job_id]
+
+def _run_job(job, first_day, last_day):
+    """Compute a range report once a job slot is free"""
+    def progress(done, total):
+        job['progress'] = {'days_done': done, 'days_total': total}
+
+    with _get_job_slots():
+        job['status'] = 'running'
+        try:
+            job['result'] = build_range_report(first_day, last_day, progress)
+            job['status'] = 'done'
+        except Exception as e:
+            job['error'] = str(e)
+            job['status'] = 'failed'
+            print(f"Report job {job['id']} failed: {e}")
+        job['finished_at'] = datetime.now().isoformat()
+
+    with _jobs_lock:
+        _forget_old_jobs()
+
+def submit_range_report(first_day, last_day, spawn):
+    """Queue a range report; returns its job (an identical queued/running job is reused)
+
+    spawn starts a background task, e.g. socketio.start_background_task.
+    Raises JobQueueFull rather than queue more than REPORT_JOB_QUEUE jobs.
+    """
+    params = {'start': first_day.strftime('%Y-%m-%d'), 'end': last_day.strftime('%Y-%m-%d')}
+    with _jobs_lock:
+        pending = [job for job in _jobs.values() if job['status'] in ('queued', 'running')]
+        for job in pending:
+            if job['params'] == params:
+                return job
+        if len(pending) >= config.REPORT_JOB_QUEUE:
+            raise JobQueueFull()
+
+        job = {
+            'id': uuid.uuid4().hex,
+            'kind': 'range',
+            'params': params,
+            'status': 'queued',
+            'progress': {'days_done': 0, 'days_total': (last_day - first_day).days + 1},
+            'result': None,
+            'error': None,
+            'created_at': datetime.now().isoformat(),
+            'finished_at': None
+        }
+        _jobs[job['id']] = job
+
+    spawn(_run_job, job, first_day, last_day)
+    return job
+
+def get_job(job_id):
+    """Look up a report job by id (None if unknown or expired)"""
+    with _jobs_lock:
+        return _jobs.get(job_id)
@@ -6,31 +6,41 @@ import time
 import sys
 from datetime import datetime
 
-# Try to import PN532 library
-try:
-    import board
-    import busio
-    from adafruit_pn532.i2c import PN532_I2C
-    HARDWARE_AVAILABLE = True
-    print("✓ Using PN532 NFC module (Adafruit library)")
-except ImportError:
-    print("WARNING: PN532 library not found. Running in simulation mode.")
-    HARDWARE_AVAILABLE = False
-
 import models
-from config import RFID_SCAN_INTERVAL
+import debounce
+import profiler
+from config import (RFID_SCAN_INTERVAL, RFID_PROBE_FIRMWARE, RFID_DEBOUNCE_SECONDS,
+                    RFID_HOLD_GAP, RFID_DEBOUNCE_MAX_CARDS, RFID_MIN_SESSION_SECONDS)
+
+def load_hardware():
+    """Import the PN532 library on first use (keeps `import rfid_scanner` fast)
+    
+    Returns (board, busio, PN532_I2C), or None in simulation mode.
+    """
+    try:
+        import board
+        import busio
+        from adafruit_pn532.i2c import PN532_I2C
+    except ImportError:
+        print("WARNING: PN532 library not found. Running in simulation mode.")
+        return None
+    print("✓ Using PN532 NFC module (Adafruit library)")
+    return board, busio, PN532_I2C
 
 class RFIDScanner:
     def __init__(self):
-        if HARDWARE_AVAILABLE:
+        hardware = load_hardware()
+        if hardware:
+            board, busio, PN532_I2C = hardware
             try:
                 # Initialize I2C and PN532
                 i2c = busio.I2C(board.SCL, board.SDA)
                 self.reader = PN532_I2C(i2c, debug=False)
                 
-                # Get firmware version to verify connection
-                ic, ver, rev, support = self.reader.firmware_version
-                print(f"✓ PN532 initialized - Firmware v{ver}.{rev}")
+                # Firmware probe is an extra I2C round trip - only for diagnosing wiring
+                if RFID_PROBE_FIRMWARE:
+                    ic, ver, rev, support = self.reader.firmware_version
+                    print(f"✓ PN532 initialized - Firmware v{ver}.{rev}")
                 
                 # Configure SAM
                 self.reader.SAM_configuration()
@@ -46,9 +56,12 @@ class RFIDScanner:
             self.reader = None
             self.hardware_available = False
         
-        self.last_scan_uid = None
-        self.last_scan_time = 0
-        self.scan_cooldown = 2  # Seconds to prevent double-scans
+        # Per-card cooldown and hold detection (prevents double-scans)
+        self.debounce = debounce.DebounceTable(
+            cooldown=RFID_DEBOUNCE_SECONDS,
+            hold_gap=RFID_HOLD_GAP,
+            max_cards=RFID_DEBOUNCE_MAX_CARDS
+        )
     
     def read_card(self):
         """Read NFC/RFID card and return UID"""
@@ -69,13 +82,9 @@ class RFIDScanner:
     
     def process_scan(self, rfid_uid):
         """Process a card scan - check in or check out"""
-        current_time = time.time()
-        if rfid_uid == self.last_scan_uid and (current_time - self.last_scan_time) < self.scan_cooldown:
+        if self.debounce.check(rfid_uid, time.monotonic()) != debounce.ACCEPT:
             return None
         
-        self.last_scan_uid = rfid_uid
-        self.last_scan_time = current_time
-        
         user = models.get_user_by_rfid(rfid_uid)
         
         if not user:
@@ -83,9 +92,19 @@ class RFIDScanner:
             self.beep(pattern='error')
             return {'status': 'error', 'message': 'Card not registered'}
         
-        is_checked_in = models.get_user_status(user['id'])
+        open_checkin = models.get_open_checkin(user['id'])
         
-        if is_checked_in:
+        if open_checkin:
+            session_seconds = (datetime.now() - datetime.fromisoformat(open_checkin['check_in_time'])).total_seconds()
+            if session_seconds < RFID_MIN_SESSION_SECONDS:
+                print(f"⚠️  {user['name']} checked in {int(session_seconds)}s ago - tap ignored")
+                self.beep(pattern='error')
+                return {
+                    'status': 'ignored',
+                    'user': dict(user),
+                    'message': f"{user['name']} is already checked in"
+                }
+            
             success, message = models.check_out(user['id'])
             if success:
                 print(f"✓ {user['name']} checked OUT at {datetime.now().strftime('%H:%M:%S')}")
@@ -132,14 +151,15 @@ class RFIDScanner:
         
         try:
             while True:
+                profiler.poll('scanner')  # Time-gated; starts captures requested from the admin panel
                 if self.hardware_available:
-                    rfid_uid = self.read_card()
-                    if rfid_uid:
-                        result = self.process_scan(rfid_uid)
-                        if result:
-                            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                            print(f"[{timestamp}] {result['message']}")
-                            print("-" * 60)
+                    with profiler.profiled():
+                        rfid_uid = self.read_card()
+                        result = self.process_scan(rfid_uid) if rfid_uid else None
+                    if result:
+                        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                        print(f"[{timestamp}] {result['message']}")
+                        print("-" * 60)
                 
                 time.sleep(RFID_SCAN_INTERVAL)
                 
@@ -0,0 +1,84 @@
+"""
+Production server launcher for RFID Attendance System
+Runs app.py on an eventlet or gevent event loop instead of the threading
+development server, so many display kiosks can hold websockets open while
+admins run reports. If neither library is installed it falls back to the
+threading server with a warning rather than failing to start.
+
+Usage:
+    python3 server.py [--mode eventlet|gevent|threading] [--port 5000]
+                      [--connections 1000] [--db-workers 4]
+"""
+import argparse
+import importlib.util
+import os
+
+import config
+
+def parse_args():
+    """Parse command line options (defaults come from config.py)"""
+    parser = argparse.ArgumentParser(description='RFID Attendance production server')
+    parser.add_argument('--mode', choices=['eventlet', 'gevent', 'threading'], default='eventlet',
+                        help='Async worker implementation')
+    parser.add_argument('--host', default=config.HOST)
+    parser.add_argument('--port', type=int, default=config.PORT)
+    parser.add_argument('--connections', type=int, default=config.WORKER_CONNECTIONS,
+                        help='Maximum concurrent connections')
+    parser.add_argument('--db-workers', type=int, default=config.DB_POOL_WORKERS,
+                        help='OS threads for blocking database work')
+    return parser.parse_args()
+
+def resolve_mode(requested):
+    """The requested mode if its library is installed, else the other async library, else threading"""
+    if requested == 'threading':
+        return requested
+    for mode in (requested, 'gevent' if requested == 'eventlet' else 'eventlet'):
+        if importlib.util.find_spec(mode) is not None:
+            if mode != requested:
+                print(f"WARNING: {requested} is not installed; using {mode}")
+            return mode
+    print(f"WARNING: neither eventlet nor gevent is installed; falling back to the threading server "
+          f"(pip install eventlet for many concurrent displays)")
+    return 'threading'
+
+def main():
+    args = parse_args()
+    args.mode = resolve_mode(args.mode)
+
+    # Must happen before app.py (and flask/sqlite users) are imported
+    os.environ['ATTENDANCE_ASYNC_MODE'] = args.mode
+    config.ASYNC_MODE = args.mode
+    config.DB_POOL_WORKERS = args.db_workers
+    config.DEBUG = False
+
+    server_kwargs = {}
+    if args.mode == 'eventlet':
+        os.environ['EVENTLET_THREADPOOL_SIZE'] = str(args.db_workers)
+        import eventlet
+        eventlet.monkey_patch()
+        server_kwargs['max_size'] = args.connections
+    elif args.mode == 'gevent':
+        from gevent import monkey
+        monkey.patch_all()
+        import gevent
+        from gevent.pool import Pool
+        gevent.get_hub().threadpool.maxsize = args.db_workers
+        server_kwargs['spawn'] = Pool(args.connections)
+    else:
+        server_kwargs['allow_unsafe_werkzeug'] = True
+
+    from app import create_app, socketio
+    app = create_app()
+
+    print("="*50)
+    print("RFID Attendance System - Production Server")
+    print("="*50)
+    print(f"Mode: {args.mode}  Connections: {args.connections}  DB workers: {args.db_workers}")
+    print(f"Listening on http://{args.host}:{args.port}")
+    print("="*50)
+
+    socketio.run(app, host=args.host, port=args.port, debug=False,
+                 use_reloader=False, log_output=False, **server_kwargs)
+
+if __name__ == '__main__':
+    main()
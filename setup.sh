@@ -51,6 +51,7 @@ echo "Step 5: Installing Python packages..."
 source venv/bin/activate
 pip install --upgrade pip
 pip install -r requirements.txt
+pip install eventlet  # Async workers for server.py (it falls back to threading without them)
 echo "✅ Python packages installed"
 
 echo ""
@@ -90,7 +91,7 @@ Type=simple
 User=$USER
 WorkingDirectory=$WORK_DIR
 Environment="PATH=$WORK_DIR/venv/bin"
-ExecStart=$WORK_DIR/venv/bin/python3 app.py
+ExecStart=$WORK_DIR/venv/bin/python3 server.py
 Restart=always
 RestartSec=10
 
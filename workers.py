@@ -0,0 +1,36 @@
+"""
+Bounded worker pool for blocking work (SQLite queries, report building)
+Keeps long-running DB work off the server's event loop so websocket
+heartbeats keep flowing while admins run reports
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool():
+    """Create the shared thread pool on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=config.DB_POOL_WORKERS,
+                                           thread_name_prefix='db-worker')
+    return _pool
+
+def run_blocking(func, *args, **kwargs):
+    """Run func on a real OS thread from the bounded pool and wait for its result
+
+    Under eventlet/gevent the calling green thread yields while waiting, so
+    the event loop keeps serving other clients.
+    """
+    if config.ASYNC_MODE == 'eventlet':
+        from eventlet import tpool
+        return tpool.execute(func, *args, **kwargs)
+    if config.ASYNC_MODE == 'gevent':
+        import gevent
+        return gevent.get_hub().threadpool.apply(func, args, kwargs)
+    return _get_pool().submit(func, *args, **kwargs).result()